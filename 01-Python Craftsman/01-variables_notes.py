@@ -95,6 +95,73 @@ def magic_bubble_sort(numbers: List[int]):
     return numbers
 
 
+# 1.1 O(n log n) 版本：排序规则不变（奇数在前，偶数在后，各自从小到大）
+    # - 复合排序键 (num % 2 == 0, num) 就能表达同样的规则，直接交给 list.sort()
+    # - 这里先整体排序，再稳定地按奇偶拆成两段拼接，省掉给每个元素创建元组的开销
+    # - 安装了 NumPy 时，先按奇偶分组，再对两组分别排序
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def magic_sort(numbers: List[int]):
+    """
+    与 magic_bubble_sort 排序结果相同的 O(n log n) 版本
+
+    :param numbers: 需要排序的列表，函数会直接修改原始列表
+    :return: 排序后的原始列表
+    """
+    numbers.sort()
+    numbers[:] = [num for num in numbers if num % 2] + [num for num in numbers if not num % 2]
+    return numbers
+
+
+def magic_sorted(numbers: List[int]) -> List[int]:
+    """返回排好序的新列表，不修改原始列表"""
+    return sorted(numbers, key=lambda num: (num % 2 == 0, num))
+
+
+def magic_sort_numpy(numbers: List[int]):
+    """
+    NumPy 版本的 magic_sort，没有安装 NumPy 或者不全是 int64 范围内的整数（如浮点数、大整数）时退回到 magic_sort
+
+    :param numbers: 需要排序的列表，函数会直接修改原始列表
+    :return: 排序后的原始列表
+    """
+    if np is None:
+        return magic_sort(numbers)
+    arr = np.asarray(numbers)
+    # 不指定 dtype，避免浮点数被截断为整数；超出 int64 范围的整数会得到 object 数组
+    if arr.dtype.kind not in 'iu':
+        return magic_sort(numbers)
+    is_odd = (arr % 2).astype(bool)
+    numbers[:] = np.concatenate((np.sort(arr[is_odd]), np.sort(arr[~is_odd]))).tolist()
+    return numbers
+
+
+def check_magic_sort(rounds=1000):
+    """随机生成列表，校验各个版本与 magic_bubble_sort 的排序结果及原地修改行为一致
+
+    列表包括小整数、超出 int64 范围的大整数和浮点数，结果中每个元素的类型也必须一致
+    """
+    import random
+
+    make_number = (
+        lambda: random.randint(-50, 50),
+        lambda: random.randint(-2 ** 70, 2 ** 70),
+        lambda: random.choice([random.randint(-50, 50), random.randint(-50, 50) + 0.5, float(random.randint(-50, 50))]),
+    )
+    for i in range(rounds):
+        numbers = [make_number[i % len(make_number)]() for _ in range(random.randint(0, 30))]
+        expected = magic_bubble_sort(list(numbers))
+        for result in [magic_sorted(numbers)] + [sort_func(list(numbers)) for sort_func in (magic_sort, magic_sort_numpy)]:
+            assert result == expected and list(map(type, result)) == list(map(type, expected)), (numbers, result)
+        for sort_func in (magic_sort, magic_sort_numpy):
+            copied = list(numbers)
+            assert sort_func(copied) is copied
+
+
 # 2.同一作用域内不要有太多变量，对局部变量分组并建模
 class ImportedSummary:
     """保存导入结果摘要数据类"""
@@ -102,6 +169,18 @@ class ImportedSummary:
     def __init__(self):
         self.succeeded_count = 0
         self.failed_count = 0
+        # 批量导入时各阶段的耗时（秒）
+        self.parse_seconds = 0.0
+        self.classify_seconds = 0.0
+        self.write_seconds = 0.0
+        self.elapsed_seconds = 0.0
+
+    @property
+    def throughput(self):
+        """每秒处理的用户数"""
+        if not self.elapsed_seconds:
+            return 0.0
+        return (self.succeeded_count + self.failed_count) / self.elapsed_seconds
 
 
 class ImportingUserGroup:
@@ -129,3 +208,292 @@ def import_users_from_file(fp):
     #  ... 读取 import_user_group，写入数据库并修改成功与失败的数量
 
     return summary.succeeded_count, summary.failed_count
+
+
+# 3.批量导入用户：按批解析、哈希去重、executemany 批量写库
+    # - 逐个用户写库时，每次写入都是一次网络往返和一次事务提交，几百万用户要跑几个小时
+    # - 每批读取 batch_size 行，ImportingUserGroup 只保存当前批次，写完即丢弃
+    # - 用集合记录本次已导入的用户名，判断重复只需 O(1)；库中已有的用户名按批一次查出
+    # - 每批正常用户在一个事务里用 executemany 写入，写完更新 ImportedSummary
+import time
+from itertools import islice
+from typing import NamedTuple
+
+
+class ParsedUser(NamedTuple):
+    """从文件中解析出的用户"""
+    username: str
+    email: str
+
+
+def parse_user(line):
+    """
+    解析一行 “用户名,邮箱” 格式的用户数据
+
+    :return: ParsedUser，格式错误时返回 None
+    """
+    username, sep, email = line.strip().partition(',')
+    if not username or not sep:
+        return None
+    return ParsedUser(username, email)
+
+
+# SQLite 单条语句最多允许 999 个参数（旧版本），查询已有用户名时按此分段
+_MAX_SQL_PARAMS = 900
+
+
+def _fetch_existing_usernames(conn, usernames):
+    """查询数据库中已经存在的用户名"""
+    existing = set()
+    usernames = list(usernames)
+    for i in range(0, len(usernames), _MAX_SQL_PARAMS):
+        part = usernames[i:i + _MAX_SQL_PARAMS]
+        placeholders = ','.join('?' * len(part))
+        cursor = conn.execute(f'SELECT username FROM users WHERE username IN ({placeholders})', part)
+        existing.update(row[0] for row in cursor)
+    return existing
+
+
+def _classify_users(users, conn, seen_usernames, banned_usernames):
+    """把一批用户分为重复、被封禁与正常三组
+
+    :param seen_usernames: 此前已经导入的用户名集合，会被直接修改
+    """
+    group = ImportingUserGroup()
+    existing = _fetch_existing_usernames(conn, {user.username for user in users})
+    for user in users:
+        if user.username in banned_usernames:
+            group.banned.append(user)
+        elif user.username in seen_usernames or user.username in existing:
+            group.duplicated.append(user)
+        else:
+            seen_usernames.add(user.username)
+            group.normal.append(user)
+    return group
+
+
+def _write_users(conn, users):
+    """在一个事务中批量写入用户"""
+    try:
+        conn.executemany('INSERT INTO users (username, email) VALUES (?, ?)', users)
+    except Exception:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def import_users_from_file_v2(fp, conn, banned_usernames=frozenset(), batch_size=1000, on_batch=None):
+    """
+    按批次从文件对象读取用户，然后批量导入数据库
+
+    :param fp: 可读文件对象，每行格式为 “用户名,邮箱”
+    :param conn: 数据库连接（sqlite3，或其他 paramstyle 为 qmark 的 DB-API 连接）
+    :param banned_usernames: 被封禁的用户名集合
+    :param batch_size: 每批处理的行数，同时也是每个事务写入的最大用户数
+    :param on_batch: 每批写入完成后调用 on_batch(summary)，可用于输出进度
+    :return: 成功与失败的数量
+    """
+    summary = ImportedSummary()
+    seen_usernames = set()
+    started = time.perf_counter()
+    for lines in iter(lambda: list(islice(fp, batch_size)), []):
+        users, failed_count, parse_seconds = _parse_lines(lines)
+        summary.failed_count += failed_count
+        summary.parse_seconds += parse_seconds
+
+        _import_user_batch(users, conn, seen_usernames, banned_usernames, summary)
+        summary.elapsed_seconds = time.perf_counter() - started
+        if on_batch is not None:
+            on_batch(summary)
+
+    return summary.succeeded_count, summary.failed_count
+
+
+def _parse_lines(lines):
+    """解析一批行
+
+    :return: (用户列表, 格式错误的行数, 耗时)
+    """
+    st = time.perf_counter()
+    users = []
+    failed_count = 0
+    for line in lines:
+        parsed_user = parse_user(line)
+        if parsed_user is None:
+            failed_count += 1
+        else:
+            users.append(parsed_user)
+    return users, failed_count, time.perf_counter() - st
+
+
+def _import_user_batch(users, conn, seen_usernames, banned_usernames, summary):
+    """对一批已解析的用户分组并写库，同时更新 summary 中的数量与耗时"""
+    st = time.perf_counter()
+    group = _classify_users(users, conn, seen_usernames, banned_usernames)
+    summary.classify_seconds += time.perf_counter() - st
+
+    st = time.perf_counter()
+    if group.normal:
+        _write_users(conn, group.normal)
+    summary.write_seconds += time.perf_counter() - st
+
+    summary.succeeded_count += len(group.normal)
+    summary.failed_count += len(group.duplicated) + len(group.banned)
+
+'''
+>>> import sqlite3
+>>> conn = sqlite3.connect(':memory:')
+>>> conn.execute('CREATE TABLE users (username TEXT PRIMARY KEY, email TEXT)')
+>>> with open('users.txt') as fp:
+...     import_users_from_file_v2(fp, conn, banned_usernames={'spammer'}, batch_size=5000)
+'''
+
+
+def check_import_users():
+    """在 SQLite 内存数据库中校验 import_users_from_file_v2 的成功与失败数量
+
+    覆盖同一批次内重复、跨批次重复、库中已存在、被封禁以及格式错误的行
+    """
+    import io
+    import sqlite3
+
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE users (username TEXT PRIMARY KEY, email TEXT)')
+    conn.execute("INSERT INTO users (username, email) VALUES ('erin', 'erin@old.com')")
+    conn.commit()
+
+    # batch_size=3 时分为 4 批
+    fp = io.StringIO(
+        'alice,alice@example.com\n'
+        'bob,bob@example.com\n'
+        'alice,alice2@example.com\n'  # 同一批次内重复
+        'carol,carol@example.com\n'
+        'spammer,spammer@example.com\n'  # 被封禁
+        'bob,bob2@example.com\n'  # 跨批次重复
+        'no-comma-line\n'  # 格式错误
+        ',nobody@example.com\n'  # 格式错误：用户名为空
+        'dave,dave@example.com\n'
+        'erin,erin@example.com\n'  # 库中已存在
+    )
+    batches = []
+    result = import_users_from_file_v2(
+        fp, conn, banned_usernames={'spammer'}, batch_size=3,
+        on_batch=lambda summary: batches.append((summary.succeeded_count, summary.failed_count)),
+    )
+    assert result == (4, 6), result
+    assert batches == [(2, 1), (3, 3), (4, 5), (4, 6)], batches
+    assert dict(conn.execute('SELECT username, email FROM users')) == {
+        'alice': 'alice@example.com',
+        'bob': 'bob@example.com',
+        'carol': 'carol@example.com',
+        'dave': 'dave@example.com',
+        'erin': 'erin@old.com',
+    }
+
+
+# 4.多进程解析 + 有界队列写库：内存占用与文件大小无关
+    # - 读取线程按批把行交给进程池解析，同时在途的批次最多 max_pending 个
+    # - 解析结果按原顺序放入容量为 queue_size 的队列，当前线程（持有数据库连接）从队列取出并写库
+    # - 写库慢于解析时，队列写满会阻塞读取线程，从而限制内存中的批次数量
+    # - 不再用集合记住所有已导入的用户名：之前批次已经提交，跨批次的重复由数据库查询发现
+    #   （需要 users.username 上有索引或唯一约束）
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# 读取线程结束的标记
+_PARSE_DONE = object()
+
+
+def _produce_parsed_batches(fp, batch_size, executor, parsed_queue, max_pending, stop_event):
+    """读取线程：分批提交解析任务，并按提交顺序把结果放入队列"""
+    try:
+        pending = deque()
+        for lines in iter(lambda: list(islice(fp, batch_size)), []):
+            if stop_event.is_set():
+                break
+            pending.append(executor.submit(_parse_lines, lines))
+            if len(pending) >= max_pending:
+                parsed_queue.put(pending.popleft().result())
+        while pending and not stop_event.is_set():
+            parsed_queue.put(pending.popleft().result())
+    except BaseException as e:
+        # 把异常交给写库的线程重新抛出
+        parsed_queue.put(e)
+    parsed_queue.put(_PARSE_DONE)
+
+
+def import_users_from_file_parallel(
+        fp,
+        conn,
+        banned_usernames=frozenset(),
+        batch_size=5000,
+        processes=None,
+        max_pending=None,
+        queue_size=4,
+        on_batch=None,
+):
+    """
+    多进程解析用户文件并批量导入数据库，内存中最多同时存在 max_pending + queue_size 个批次
+
+    :param fp: 可读文件对象，每行格式为 “用户名,邮箱”
+    :param conn: 数据库连接，只在当前线程中使用
+    :param processes: 解析进程数，默认为 CPU 核数
+    :param max_pending: 同时在进程池中解析的最大批次数，默认为进程数的 2 倍
+    :param queue_size: 等待写库的最大批次数
+    :return: ImportedSummary，包含成功与失败的数量、各阶段耗时与吞吐量
+    """
+    processes = processes or os.cpu_count() or 1
+    max_pending = max_pending or processes * 2
+    summary = ImportedSummary()
+    started = time.perf_counter()
+    parsed_queue = queue.Queue(maxsize=queue_size)
+    stop_event = threading.Event()
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        producer = threading.Thread(
+            target=_produce_parsed_batches,
+            args=(fp, batch_size, executor, parsed_queue, max_pending, stop_event),
+            daemon=True,
+        )
+        producer.start()
+        try:
+            while True:
+                item = parsed_queue.get()
+                if item is _PARSE_DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+
+                users, failed_count, parse_seconds = item
+                summary.failed_count += failed_count
+                summary.parse_seconds += parse_seconds
+                _import_user_batch(users, conn, set(), banned_usernames, summary)
+                summary.elapsed_seconds = time.perf_counter() - started
+                if on_batch is not None:
+                    on_batch(summary)
+        finally:
+            # 写库出错时通知读取线程停止，并清空队列，避免它阻塞在 put() 上
+            stop_event.set()
+            while producer.is_alive():
+                try:
+                    parsed_queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            producer.join()
+
+    summary.elapsed_seconds = time.perf_counter() - started
+    return summary
+
+'''
+>>> summary = import_users_from_file_parallel(fp, conn, processes=8)
+>>> print(f'{summary.throughput:.0f} users/s, parse: {summary.parse_seconds:.1f}s, '
+...       f'classify: {summary.classify_seconds:.1f}s, write: {summary.write_seconds:.1f}s')
+'''
+
+
+if __name__ == '__main__':
+    check_magic_sort()
+    check_import_users()
@@ -68,7 +68,7 @@ def fetch_users_v2(
         sort_field="created",
 ):
     """获取用户列表"""
-    query = select([users.c.id, users.c.name])
+    query = select(users.c.id, users.c.name)
     if min_level != None:
         query = query.where(users.c.level >= min_level)
     if gender != None:
@@ -77,6 +77,156 @@ def fetch_users_v2(
     return list(conn.execute(query))
 
 
+# 2.1 缓存查询语句 + 流式读取 + keyset 分页
+    # - fetch_users_v2 每次调用都重新构造 select；过滤条件的组合只有几种，按组合缓存语句对象，
+    #   具体的值用 bindparam 绑定参数传入，SQLAlchemy 会按语句缓存编译结果，不再重复编译
+    # - list(conn.execute(query)) 会一次性把所有结果读入内存，改为 stream_results 服务端游标逐批读取
+    # - keyset 分页：按 (sort_field, id) 排序，下一页从上一页最后一行之后开始，不使用 OFFSET
+    #   sort_field 为 NULL 的行统一排在最后，游标为 NULL 时只在这些行中按 id 继续翻页
+from functools import lru_cache
+
+from sqlalchemy import and_, bindparam, or_, select, tuple_
+
+
+@lru_cache(maxsize=None)
+def _build_users_query(table, has_min_level, has_gender, sort_field, keyset):
+    """按过滤条件的组合构造查询语句，条件的值全部使用绑定参数
+
+    :param keyset: False 表示第一页；'value' / 'null' 表示从游标之后开始，游标的排序值非空 / 为空
+    """
+    try:
+        sort_column = table.c[sort_field]
+    except KeyError:
+        raise ValueError(f'Unknown sort field: {sort_field}')
+
+    query = select(table.c.id, table.c.name, sort_column.label('sort_key'))
+    if has_min_level:
+        query = query.where(table.c.level >= bindparam('min_level'))
+    if has_gender:
+        query = query.where(table.c.gender == bindparam('gender'))
+    query = query.where(table.c.has_membership == bindparam('has_membership'))
+    if keyset:
+        # 绑定参数指定列的类型，datetime 等值才会按列类型转换后再比较
+        after_id = bindparam('after_id', type_=table.c.id.type)
+        if keyset == 'null':
+            query = query.where(and_(sort_column.is_(None), table.c.id > after_id))
+        else:
+            after_sort_key = bindparam('after_sort_key', type_=sort_column.type)
+            query = query.where(or_(
+                sort_column.is_(None),
+                tuple_(sort_column, table.c.id) > tuple_(after_sort_key, after_id),
+            ))
+        query = query.limit(bindparam('limit'))
+    return query.order_by(sort_column.is_(None), sort_column, table.c.id)
+
+
+def _users_query_params(min_level, gender, has_membership):
+    params = {'has_membership': has_membership}
+    if min_level is not None:
+        params['min_level'] = min_level
+    if gender is not None:
+        params['gender'] = gender
+    return params
+
+
+def iter_users(
+        conn,
+        min_level=None,
+        gender=None,
+        has_membership=False,
+        sort_field="created",
+        batch_size=1000,
+        table=None,
+):
+    """生成器：流式返回用户列表，每行为 (id, name, sort_key)
+
+    :param batch_size: 每次从数据库游标读取的行数
+    :param table: 用户表，默认为 users
+    """
+    table = users if table is None else table
+    query = _build_users_query(table, min_level is not None, gender is not None, sort_field, False)
+    # 执行选项只作用于这条语句，不修改调用方的连接
+    result = conn.execute(
+        query,
+        _users_query_params(min_level, gender, has_membership),
+        execution_options={'stream_results': True, 'yield_per': batch_size},
+    )
+    for rows in result.partitions(batch_size):
+        yield from rows
+
+
+def fetch_users_page(
+        conn,
+        min_level=None,
+        gender=None,
+        has_membership=False,
+        sort_field="created",
+        after=None,
+        limit=100,
+        table=None,
+):
+    """按 keyset 分页获取用户列表
+
+    :param after: 上一页返回的游标，获取第一页时为 None
+    :param table: 用户表，默认为 users
+    :return: (本页用户列表, 下一页游标)，没有下一页时游标为 None
+    """
+    table = users if table is None else table
+    params = _users_query_params(min_level, gender, has_membership)
+    has_min_level, has_gender = min_level is not None, gender is not None
+    if after is None:
+        query = _build_users_query(table, has_min_level, has_gender, sort_field, False).limit(limit)
+    elif after[0] is None:
+        query = _build_users_query(table, has_min_level, has_gender, sort_field, 'null')
+        params.update(after_id=after[1], limit=limit)
+    else:
+        query = _build_users_query(table, has_min_level, has_gender, sort_field, 'value')
+        params.update(after_sort_key=after[0], after_id=after[1], limit=limit)
+
+    rows = list(conn.execute(query, params))
+    next_after = (rows[-1].sort_key, rows[-1].id) if len(rows) == limit else None
+    return rows, next_after
+
+
+def bench_fetch_users(rows_count=1000000):
+    """在 SQLite 内存数据库中对比一次性读取全部结果（fetch_users_v2 的做法）与 iter_users 的耗时"""
+    import random
+    import time
+    from sqlalchemy import Boolean, Column, DateTime, Integer, MetaData, String, Table, create_engine
+
+    metadata = MetaData()
+    table = Table(
+        'users', metadata,
+        Column('id', Integer, primary_key=True),
+        Column('name', String),
+        Column('level', Integer),
+        Column('gender', Integer),
+        Column('has_membership', Boolean),
+        Column('created', DateTime),
+    )
+    engine = create_engine('sqlite://')
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(table.insert(), [
+            {'name': f'user{i}', 'level': random.randint(0, 10), 'gender': random.randint(0, 1),
+             'has_membership': random.random() < 0.5, 'created': None}
+            for i in range(rows_count)
+        ])
+
+    params = _users_query_params(min_level=3, gender=1, has_membership=False)
+    query = _build_users_query(table, True, True, 'level', False)
+    with engine.connect() as conn:
+        for name, func in (
+            ('fetch all', lambda: len(list(conn.execute(query, params)))),
+            ('iter_users', lambda: sum(1 for _ in iter_users(conn, min_level=3, gender=1, sort_field='level', table=table))),
+        ):
+            st = time.perf_counter()
+            count = func()
+            print(f'{name}: {count} rows, {time.perf_counter() - st:.3f} seconds')
+
+# bench_fetch_users()
+
+
 # 3.使用 Jinja2 模板处理字符串
 from jinja2 import Template
 
@@ -93,6 +243,106 @@ def render_movies_j2(username, movies):
     return tmpl.render(username=username, movies=movies)
 
 
+# 3.1 模板注册表：每个模板只编译一次
+    # - render_movies_j2 每次调用都 Template(_MOVIES_TMPL)，Jinja2 都要重新解析、编译成 Python 代码
+    # - 在模块级注册表中按名字缓存编译好的模板；指定目录后还会把字节码缓存到磁盘，新进程启动时无须重新编译
+    # - generate() 逐段返回渲染结果，长列表不必先拼成一个完整的大字符串
+    # - 记录每个模板的编译耗时、渲染次数和渲染总耗时
+import time
+
+from jinja2 import DictLoader, Environment, FileSystemBytecodeCache
+
+
+class TemplateStats:
+    """单个模板的耗时统计"""
+
+    def __init__(self):
+        self.compile_seconds = 0.0
+        self.render_count = 0
+        self.render_seconds = 0.0
+
+
+class TemplateRegistry:
+    """按名字注册并缓存编译后的 Jinja2 模板
+
+    :param bytecode_cache_dir: 字节码缓存目录，为 None 时不使用磁盘缓存
+    """
+
+    def __init__(self, bytecode_cache_dir=None):
+        self._sources = {}
+        self._templates = {}
+        self.stats = {}
+        bytecode_cache = FileSystemBytecodeCache(bytecode_cache_dir) if bytecode_cache_dir else None
+        # 编译结果由 self._templates 缓存，关闭 Environment 自身的缓存与过期检查
+        self.env = Environment(
+            loader=DictLoader(self._sources),
+            bytecode_cache=bytecode_cache,
+            auto_reload=False,
+            cache_size=0,
+        )
+
+    def register(self, name, source):
+        """注册模板源码，重复注册时会丢弃旧的编译结果"""
+        self._sources[name] = source
+        self._templates.pop(name, None)
+        self.stats[name] = TemplateStats()
+
+    def get(self, name):
+        """返回编译好的模板，第一次获取时编译"""
+        try:
+            return self._templates[name]
+        except KeyError:
+            pass
+        st = time.perf_counter()
+        tmpl = self._templates[name] = self.env.get_template(name)
+        self.stats[name].compile_seconds = time.perf_counter() - st
+        return tmpl
+
+    def render(self, name, **context):
+        """渲染模板，返回完整的字符串"""
+        tmpl = self.get(name)
+        st = time.perf_counter()
+        result = tmpl.render(**context)
+        self._add_render_time(name, time.perf_counter() - st)
+        return result
+
+    def generate(self, name, **context):
+        """生成器：逐段返回渲染结果，全部返回后计入渲染耗时"""
+        tmpl = self.get(name)
+        started = time.perf_counter()
+        # 不统计调用方处理每段结果的时间
+        consumer_seconds = 0.0
+        for chunk in tmpl.generate(**context):
+            st = time.perf_counter()
+            yield chunk
+            consumer_seconds += time.perf_counter() - st
+        self._add_render_time(name, time.perf_counter() - started - consumer_seconds)
+
+    def _add_render_time(self, name, seconds):
+        stats = self.stats[name]
+        stats.render_count += 1
+        stats.render_seconds += seconds
+
+    def print_stats(self):
+        for name, stats in self.stats.items():
+            avg = stats.render_seconds / stats.render_count if stats.render_count else 0
+            print(f'{name}: compile {stats.compile_seconds * 1000:.2f} ms, '
+                  f'{stats.render_count} renders, avg {avg * 1000:.3f} ms')
+
+
+template_registry = TemplateRegistry()
+template_registry.register('movies', _MOVIES_TMPL)
+# 需要磁盘字节码缓存时：TemplateRegistry(bytecode_cache_dir='/var/cache/jinja2')
+
+
+def render_movies_j2_v2(username, movies):
+    return template_registry.render('movies', username=username, movies=movies)
+
+
+def generate_movies_j2(username, movies):
+    """逐段返回渲染结果，适合直接写入文件或流式响应"""
+    return template_registry.generate('movies', username=username, movies=movies)
+
 # 4.使用特殊数字：“无穷大” 排序
 def sort_users_inf(users):
     def key_func(username):
@@ -103,6 +353,73 @@ def sort_users_inf(users):
     return sorted(users.keys(), key=key_func)
 
 
+# 4.1 只取年龄最小的前 N 个用户：不必对全部用户排序
+    # - heapq.nsmallest 只维护大小为 n 的堆，复杂度 O(m log n)，结果与 sorted(...)[:n] 一致（稳定）
+    # - 年龄为空的用户单独保存前 n 个，拼在最后，不再需要 float('inf') 和 key_func 闭包
+    # - 年龄为整数时可以按年龄分桶：只保留可能进入前 n 名的桶，超出的最大年龄桶直接丢弃
+    # - 接收 (username, age) 二元组的迭代器，调用方不必先构造完整的字典
+import heapq
+from collections.abc import Mapping
+from operator import itemgetter
+
+
+def top_users_by_age(users, n, int_ages=False):
+    """返回年龄最小的 n 个用户名，年龄为空的排在最后，结果与 sort_users_inf(users)[:n] 相同
+
+    :param users: {username: age} 字典，或者 (username, age) 二元组的可迭代对象
+    :param int_ages: 年龄都是整数（或 None）时，使用分桶计数代替堆
+    """
+    if n <= 0:
+        return []
+    pairs = users.items() if isinstance(users, Mapping) else users
+    missing = []
+
+    def _with_age():
+        for username, age in pairs:
+            if age is not None:
+                yield username, age
+            elif len(missing) < n:
+                missing.append(username)
+
+    if int_ages:
+        result = _smallest_by_buckets(_with_age(), n)
+    else:
+        result = [username for username, _ in heapq.nsmallest(n, _with_age(), key=itemgetter(1))]
+    return result + missing[:n - len(result)]
+
+
+def _smallest_by_buckets(pairs, n):
+    """按整数年龄分桶，返回年龄最小的 n 个用户名（同龄用户保持原有顺序）"""
+    buckets = {}
+    kept_count = 0
+    max_age = None
+    for username, age in pairs:
+        # 已经凑够 n 个时，不小于当前最大年龄的用户不可能再进入前 n 名
+        if kept_count >= n and age >= max_age:
+            continue
+        buckets.setdefault(age, []).append(username)
+        kept_count += 1
+        if max_age is None or age > max_age:
+            max_age = age
+        # 去掉最大年龄的桶后仍然够 n 个，这个桶就不再需要
+        while kept_count - len(buckets[max_age]) >= n:
+            kept_count -= len(buckets.pop(max_age))
+            max_age = max(buckets)
+
+    result = []
+    for age in sorted(buckets):
+        result.extend(buckets[age])
+    return result[:n]
+
+"""
+>>> users = {'tom': 20, 'jerry': None, 'lily': 18, 'lucy': 20}
+>>> top_users_by_age(users, 2)
+['lily', 'tom']
+>>> top_users_by_age(iter([('a', None), ('b', 3)]), 5, int_ages=True)
+['b', 'a']
+"""
+
+
 # 5.改善超长字符串的可读性
 s = ("This is the first line of a long string, "
      "this is the second line")
@@ -124,59 +124,78 @@ def analyze_v1():
     # - 当字典键不存在时，使用 defaultdict 可以简化处理; defaultdict(int) => key不存在不报错，调用int() => 0
     # - 继承 MutableMapping 可以方便地创建自定义字典类，封装处理逻辑
 
+import bisect
 from collections import defaultdict
 from collections.abc import MutableMapping
 
 class PerfLevelDict(MutableMapping):
     """存储响应时间性能等级的字典"""
 
+    # 已经排好序的耗时分界点（参考 Movie.rank 的 bisect 写法），
+    # bisect 返回的下标就是性能等级在 PagePerfLevel 中的序号
+    breakpoints = (100, 300, 1000)
+    levels = tuple(PagePerfLevel)
+    _level_indexes = {level: index for index, level in enumerate(levels)}
+
     def __init__(self):
-        # defaultdict key不存在不报错，调用int() => 0
-        self.data = defaultdict(int)
+        # 以等级序号为下标的定长计数数组，计数为 0 表示该等级不存在
+        self.data = [0] * len(self.levels)
+
+    @classmethod
+    def from_counts(cls, counts):
+        """使用按等级顺序排列的计数列表创建字典"""
+        obj = cls()
+        obj.data = list(counts)
+        return obj
 
-    # 操作前调用了 compute_level()，将字典键转成了性能等级
+    # 操作前调用了 compute_level_index()，将字典键转成了性能等级序号
     def __getitem__(self, key):
         """当某个级别不存在时，默认返回 0"""
-        return self.data[self.compute_level(key)]
+        return self.data[self.compute_level_index(key)]
 
     def __setitem__(self, key, value):
         """将 key 转换为对应的性能等级，然后设置值"""
-        self.data[self.compute_level(key)] = value
+        self.data[self.compute_level_index(key)] = value
 
     def __delitem__(self, key):
-        del self.data[key]
+        index = self._level_indexes[key]
+        if not self.data[index]:
+            raise KeyError(key)
+        self.data[index] = 0
 
     def __iter__(self):
-        return iter(self.data)
+        return (level for level, count in zip(self.levels, self.data) if count)
 
     def __len__(self):
-        return len(self.data)
+        return len(self.data) - self.data.count(0)
 
-    @staticmethod
-    def compute_level(time_cost_str):
-        """根据响应时间计算性能等级"""
+    @classmethod
+    def compute_level_index(cls, time_cost_str):
+        """根据响应时间计算性能等级序号：一次字典查找或一次二分查找"""
         # 假如已经是性能等级，不做转换直接返回
-        if time_cost_str in list(PagePerfLevel):
-            return time_cost_str
-
-        # 根据页面耗时计算等级
-        time_cost = int(time_cost_str)
-        if time_cost < 100:
-            return PagePerfLevel.LT_100
-        elif time_cost < 300:
-            return PagePerfLevel.LT_300
-        elif time_cost < 1000:
-            return PagePerfLevel.LT_1000
-        return PagePerfLevel.GT_1000
+        index = cls._level_indexes.get(time_cost_str)
+        if index is not None:
+            return index
+        return bisect.bisect_right(cls.breakpoints, int(time_cost_str))
+
+    @classmethod
+    def compute_level(cls, time_cost_str):
+        """根据响应时间计算性能等级"""
+        return cls.levels[cls.compute_level_index(time_cost_str)]
 
     def items(self):
-        """按照顺序返回性能等级数据"""
-        return sorted(self.data.items(), key=lambda pair: list(PagePerfLevel).index(pair[0]))
+        """按照顺序返回性能等级数据，数组本身有序，无需排序"""
+        return [(level, count) for level, count in zip(self.levels, self.data) if count]
 
     def total_requests(self):
         """返回请求总数"""
-        return sum(self.values())
-        # return sum(self.data.values())
+        return sum(self.data)
+
+    def merge(self, other):
+        """把另一个 PerfLevelDict 的计数累加到当前字典，返回自身"""
+        for level, count in other.items():
+            self[level] += count
+        return self
 
 
 """
@@ -241,3 +260,705 @@ def latlon_to_address(lat, lon):
 addr = latlon_to_address(lat, lon)
 # 通过属性名来使用 addr
 # addr.country / addr.province / addr.city
+
+
+# 4.流式分析超大访问日志（GB 级）：二进制大块读取 + 增量聚合
+    # - analyze_v2 逐行 strip().split()、逐次调用 compute_level()，大文件上很慢
+    # - 按 4MB 二进制块读取，不做逐行解码，用 rpartition() 切分字段，不构造每行的字段列表
+    # - 日志格式通常为 “路径 + 单个空格 + 耗时”；新出现的路径或格式不规范的行（多个空格、制表符、
+    #   行尾空白）才退回到 split()，结果与 analyze_v2 的 line.strip().split() 一致
+    # - 计数先累加到长度为 4 的列表里（下标 = 性能等级序号），最后再转换为 PerfLevelDict
+import io
+import time
+from functools import partial
+
+LOG_BLOCK_SIZE = 1024 * 1024 * 4
+
+
+def _iter_chunks(fp, block_size, size=None):
+    """生成器：按块读取文件，size 不为 None 时最多读取 size 个字节"""
+    if size is None:
+        yield from iter(partial(fp.read, block_size), b'')
+        return
+    while size > 0:
+        chunk = fp.read(min(block_size, size))
+        if not chunk:
+            break
+        size -= len(chunk)
+        yield chunk
+
+
+def iter_log_blocks(fp, block_size=LOG_BLOCK_SIZE, size=None, yield_tail=True):
+    """生成器：分块读取二进制日志，每次返回以换行符结尾的完整行块
+
+    :param fp: 以二进制模式打开的文件对象
+    :param block_size: 每次读取的字节数
+    :param size: 最多读取的字节数，默认读到文件末尾
+    :param yield_tail: 是否返回文件末尾没有换行符的半行，增量分析时该行可能还没有写完
+    """
+    tail = b''
+    for chunk in _iter_chunks(fp, block_size, size):
+        pos = chunk.rfind(b'\n')
+        if pos == -1:
+            tail += chunk
+            continue
+        # 把上一块剩下的半行拼到本块开头
+        yield tail + chunk[:pos + 1]
+        tail = chunk[pos + 1:]
+    if tail and yield_tail:
+        yield tail
+
+
+def _split_log_line(line):
+    """慢路径：按任意空白切分一行，返回 (path, time_cost)，空行返回 None"""
+    fields = line.split()
+    if not fields:
+        return None
+    path, time_cost = fields
+    return path, time_cost
+
+
+def iter_log_records(block):
+    """生成器：逐行返回日志块中的 (path, time_cost)，跳过空行
+
+    字段之间可以是任意空白（空格、制表符、行尾空白），与 analyze_v2 的 line.strip().split() 一致
+    """
+    for line in block.splitlines():
+        path, _, time_cost = line.rpartition(b' ')
+        if not (path and time_cost.isdigit()) or path[:1].isspace() or path[-1:].isspace():
+            record = _split_log_line(line)
+            if record is None:
+                continue
+            path, time_cost = record
+        yield path, time_cost
+
+
+def aggregate_log_block(block, counters):
+    """解析一个日志块，把耗时等级计数累加到 counters 中
+
+    :param block: 由完整行组成的 bytes
+    :param counters: {path(bytes): [4 个等级的计数]}，会被直接修改
+    """
+    get_counts = counters.get
+    # 耗时的取值种类有限，按原始字节缓存等级序号，省掉大部分 int() 和 bisect 调用
+    level_indexes = {}
+    for line in block.splitlines():
+        path, _, time_cost = line.rpartition(b' ')
+        counts = get_counts(path)
+        if counts is None:
+            # 新路径，或者切分出的路径带有空白（格式不规范的行，不会成为 counters 的键），按任意空白重新切分
+            record = _split_log_line(line)
+            if record is None:
+                continue
+            path, time_cost = record
+            counts = get_counts(path)
+            if counts is None:
+                counts = counters[path] = [0] * len(PerfLevelDict.levels)
+
+        index = level_indexes.get(time_cost)
+        if index is None:
+            index = PerfLevelDict.compute_level_index(time_cost)
+            level_indexes[time_cost] = index
+        counts[index] += 1
+    return counters
+
+
+def counters_to_path_groups(counters):
+    """把 {path(bytes): counts} 转换成与 analyze_v2 相同的 {path: PerfLevelDict}"""
+    path_groups = {}
+    for path, counts in counters.items():
+        path_groups[path.decode('utf-8')] = PerfLevelDict.from_counts(counts)
+    return path_groups
+
+
+class _EncodedTextReader:
+    """把没有二进制缓冲区的文本流（如 io.StringIO）包装为按 UTF-8 编码读取的二进制流"""
+
+    def __init__(self, fp):
+        self.fp = fp
+
+    def read(self, size=-1):
+        return self.fp.read(size).encode('utf-8')
+
+
+def _open_log_source(source):
+    """接收文件路径或文件对象，返回 (二进制文件对象, 是否需要由调用方关闭)"""
+    if hasattr(source, 'read'):
+        # 文本模式打开的文件，直接使用底层的二进制缓冲区
+        fp = getattr(source, 'buffer', source)
+        if isinstance(fp, io.TextIOBase):
+            fp = _EncodedTextReader(fp)
+        return fp, False
+    return open(source, 'rb'), True
+
+
+def analyze_v3(source='test_log.txt', block_size=LOG_BLOCK_SIZE):
+    """流式分析访问日志，返回 {path: PerfLevelDict}
+
+    :param source: 日志文件路径或文件对象
+    :param block_size: 每次读取的字节数，默认 4MB
+    """
+    fp, should_close = _open_log_source(source)
+    counters = {}
+    try:
+        for block in iter_log_blocks(fp, block_size):
+            aggregate_log_block(block, counters)
+    finally:
+        if should_close:
+            fp.close()
+    return counters_to_path_groups(counters)
+
+
+def print_perf_report(path_groups, percentiles=(50, 95, 99)):
+    """按照 analyze_v2 的格式输出分析报告
+
+    :param percentiles: 结果支持 percentile() 查询时（如 PerfStatsDict），额外输出的分位数
+    """
+    for path, result in path_groups.items():
+        print(f'== Path: {path}')
+        print(f'    Total requests: {result.total_requests()}')
+        print(f'    Performance:')
+        for level_name, count in result.items():
+            print(f'        - {level_name}: {count}')
+        if hasattr(result, 'percentile'):
+            values = ', '.join(f'p{q}: {result.percentile(q)} ms' for q in percentiles)
+            print(f'    Percentiles: {values}')
+
+# print_perf_report(analyze_v3('test_log.txt'))
+
+
+# 4.1 生成测试日志，并对比各版本耗时
+import io
+import random
+from contextlib import redirect_stdout
+
+
+def make_test_log(fname='test_log.txt', lines_count=1000000, paths_count=1000):
+    """生成格式为 “请求路径 请求耗时” 的测试日志"""
+    paths = [f'/articles/{i}/' for i in range(paths_count)]
+    with open(fname, 'w') as fp:
+        for _ in range(lines_count):
+            fp.write(f'{random.choice(paths)} {random.randint(1, 3000)}\n')
+
+
+def bench_analyze():
+    """在 test_log.txt 所在目录执行，对比 analyze_v1 / analyze_v2 / analyze_v3 的耗时"""
+    versions = {
+        'analyze_v1': analyze_v1,
+        'analyze_v2': analyze_v2,
+        'analyze_v3': lambda: print_perf_report(analyze_v3()),
+    }
+    for name, func in versions.items():
+        st = time.perf_counter()
+        # 丢弃报告输出，只统计耗时
+        with redirect_stdout(io.StringIO()):
+            func()
+        print(f'{name}: {time.perf_counter() - st:.3f} seconds')
+
+# make_test_log()
+# bench_analyze()
+
+
+# 5.多进程并行分析：按换行符对齐的字节偏移切分大日志，或者每个进程处理一个分片文件
+    # - 子进程只返回紧凑的 {path(bytes): [4 个计数]}，避免传输大量 PerfLevelDict 对象
+    # - 按分片顺序合并，路径的首次出现顺序和单进程 analyze_v2 完全一致
+    # - 使用 spawn 启动方式的平台（Windows/macOS）上，调用方需要放在 if __name__ == '__main__' 中
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def merge_counters(counters, other):
+    """把子进程返回的计数合并到 counters 中，返回 counters"""
+    for path, counts in other.items():
+        target = counters.get(path)
+        if target is None:
+            counters[path] = list(counts)
+            continue
+        for index, count in enumerate(counts):
+            target[index] += count
+    return counters
+
+
+def merge_path_groups(path_groups, other):
+    """合并两份 {path: PerfLevelDict} 分析结果，返回 path_groups"""
+    for path, result in other.items():
+        path_groups.setdefault(path, PerfLevelDict()).merge(result)
+    return path_groups
+
+
+def split_log_offsets(fname, parts):
+    """把日志文件切分为最多 parts 段，每段的起止偏移都位于行首
+
+    :return: [(start, end), ...]
+    """
+    file_size = os.path.getsize(fname)
+    offsets = [0]
+    with open(fname, 'rb') as fp:
+        for i in range(1, parts):
+            fp.seek(file_size * i // parts)
+            # 丢弃当前这半行，定位到下一行的行首
+            fp.readline()
+            pos = fp.tell()
+            if offsets[-1] < pos < file_size:
+                offsets.append(pos)
+    offsets.append(file_size)
+    return list(zip(offsets, offsets[1:]))
+
+
+def _analyze_log_part(fname, start=0, end=None, block_size=LOG_BLOCK_SIZE):
+    """在子进程中分析日志的 [start, end) 部分，返回紧凑的计数结果"""
+    counters = {}
+    with open(fname, 'rb') as fp:
+        fp.seek(start)
+        size = None if end is None else end - start
+        for block in iter_log_blocks(fp, block_size, size):
+            aggregate_log_block(block, counters)
+    return counters
+
+
+def analyze_parallel(sources, processes=None, block_size=LOG_BLOCK_SIZE):
+    """多进程分析访问日志，结果与 analyze_v2 完全一致
+
+    :param sources: 单个日志文件路径（按字节偏移切分），或者日志文件路径列表（每个文件一个任务）
+    :param processes: 进程数，默认为 CPU 核数
+    :param block_size: 每次读取的字节数
+    :return: {path: PerfLevelDict}
+    """
+    processes = processes or os.cpu_count() or 1
+    if isinstance(sources, (str, os.PathLike)):
+        tasks = [(sources, start, end) for start, end in split_log_offsets(sources, processes)]
+    else:
+        tasks = [(fname, 0, None) for fname in sources]
+
+    counters = {}
+    if processes == 1 or len(tasks) <= 1:
+        for fname, start, end in tasks:
+            merge_counters(counters, _analyze_log_part(fname, start, end, block_size))
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            fnames, starts, ends = zip(*tasks)
+            # map() 按任务顺序返回结果，保证合并顺序
+            parts = executor.map(_analyze_log_part, fnames, starts, ends, [block_size] * len(tasks))
+            for part in parts:
+                merge_counters(counters, part)
+    return counters_to_path_groups(counters)
+
+# print_perf_report(analyze_parallel('test_log.txt', processes=32))
+# print_perf_report(analyze_parallel([f'logs/access_{hour:02}.log' for hour in range(24)]))
+
+
+# 6.耗时直方图：在性能等级之外给出 p50/p95/p99 分位数
+    # - HDR 风格的 “对数-线性” 分桶：每个 2 的幂区间再等分为若干子桶，相对误差固定
+    # - 桶的数量只由精度和最大值决定，每个路径占用固定内存；记录一次只需 O(1)
+    # - 同样布局的直方图可以直接逐桶相加合并，适合配合第 5 节的多进程分析
+from array import array
+
+
+class LatencyHistogram(MutableMapping):
+    """对数-线性分桶的耗时直方图，键为耗时（毫秒），值为该耗时所在桶的计数
+
+    :param precision_bits: 精度位数，相对误差不超过 2 ** (1 - precision_bits)，默认 7 约为 1.6%
+    :param max_value: 可以精确分桶的最大耗时，更大的值计入最后一个桶
+    """
+
+    def __init__(self, precision_bits=7, max_value=2 ** 24):
+        self.precision_bits = precision_bits
+        self.max_value = max_value
+        # 小于 sub_bucket_count 的值每个值一个桶，更大的值每个 2 的幂区间 half_count 个桶
+        self.sub_bucket_count = 1 << precision_bits
+        self.half_count = self.sub_bucket_count >> 1
+        self.counts = array('q', [0]) * (self._index_of(max_value) + 1)
+        self.total_count = 0
+        self.min_value = None
+        self.max_recorded = None
+
+    def _index_of(self, value):
+        """计算耗时所在桶的下标"""
+        if value < self.sub_bucket_count:
+            return value
+        shift = value.bit_length() - self.precision_bits
+        return self.sub_bucket_count + (shift - 1) * self.half_count + (value >> shift) - self.half_count
+
+    def _bucket_range(self, index):
+        """返回下标对应桶的 (最小值, 最大值)"""
+        if index < self.sub_bucket_count:
+            return index, index
+        shift, offset = divmod(index - self.sub_bucket_count, self.half_count)
+        shift += 1
+        lowest = (self.half_count + offset) << shift
+        return lowest, lowest + (1 << shift) - 1
+
+    def _to_index(self, key):
+        value = min(max(int(key), 0), self.max_value)
+        return value, self._index_of(value)
+
+    def record(self, time_cost, count=1):
+        """记录 count 次耗时为 time_cost 的请求"""
+        value, index = self._to_index(time_cost)
+        self.counts[index] += count
+        self.total_count += count
+        if self.min_value is None or value < self.min_value:
+            self.min_value = value
+        if self.max_recorded is None or value > self.max_recorded:
+            self.max_recorded = value
+
+    # 支持 hist[time_cost] += 1 的写法，与 PerfLevelDict 用法保持一致
+    def __getitem__(self, key):
+        """返回 key 所在桶的计数，不存在时返回 0"""
+        return self.counts[self._to_index(key)[1]]
+
+    def __setitem__(self, key, value):
+        self.record(key, value - self[key])
+
+    def __delitem__(self, key):
+        index = self._to_index(key)[1]
+        if not self.counts[index]:
+            raise KeyError(key)
+        self.total_count -= self.counts[index]
+        self.counts[index] = 0
+
+    def __iter__(self):
+        """按从小到大的顺序返回有计数的桶的最小值"""
+        return (self._bucket_range(index)[0] for index, count in enumerate(self.counts) if count)
+
+    def __len__(self):
+        return len(self.counts) - self.counts.count(0)
+
+    def percentile(self, q):
+        """返回第 q 百分位的耗时（所在桶的最大值，与 HDR Histogram 一致）
+
+        :param q: 0 ~ 100 之间的百分位
+        """
+        if not self.total_count:
+            return 0
+        rank = max(1, -(-self.total_count * q // 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                # 桶的最大值不会超过真实记录过的最大值
+                return min(self._bucket_range(index)[1], self.max_recorded)
+        return self.max_recorded
+
+    def merge(self, other):
+        """合并另一个相同布局的直方图，返回自身"""
+        if (other.precision_bits, other.max_value) != (self.precision_bits, self.max_value):
+            raise ValueError('unable to merge histograms with different layouts')
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.total_count += other.total_count
+        for value in (other.min_value, other.max_recorded):
+            if value is not None:
+                self.min_value = value if self.min_value is None else min(self.min_value, value)
+                self.max_recorded = value if self.max_recorded is None else max(self.max_recorded, value)
+        return self
+
+
+class PerfStatsDict(PerfLevelDict):
+    """在性能等级计数之外，同时记录耗时直方图的字典"""
+
+    def __init__(self):
+        super().__init__()
+        self.histogram = LatencyHistogram()
+
+    def __setitem__(self, key, value):
+        """耗时类型的 key 会按照计数增量同步记录到直方图中"""
+        index = self.compute_level_index(key)
+        if key not in self._level_indexes:
+            self.histogram.record(key, value - self.data[index])
+        self.data[index] = value
+
+    def percentile(self, q):
+        """返回第 q 百分位的耗时（毫秒）"""
+        return self.histogram.percentile(q)
+
+    def merge(self, other):
+        super().merge(other)
+        if isinstance(other, PerfStatsDict):
+            self.histogram.merge(other.histogram)
+        return self
+
+
+def analyze_with_percentiles(source='test_log.txt', block_size=LOG_BLOCK_SIZE):
+    """分析访问日志，结果同时包含性能等级计数与耗时分位数
+
+    :return: {path: PerfStatsDict}
+    """
+    path_groups = defaultdict(PerfStatsDict)
+    fp, should_close = _open_log_source(source)
+    try:
+        for block in iter_log_blocks(fp, block_size):
+            for path, time_cost in iter_log_records(block):
+                path_groups[path][int(time_cost)] += 1
+    finally:
+        if should_close:
+            fp.close()
+    return {path.decode('utf-8'): result for path, result in path_groups.items()}
+
+"""
+# 测试：
+>>> hist = LatencyHistogram()
+>>> for time_cost in range(1, 1001):
+...     hist[time_cost] += 1
+>>> hist.percentile(50), hist.percentile(99)
+(503, 991)
+"""
+
+# print_perf_report(analyze_with_percentiles('test_log.txt'), percentiles=(50, 95, 99))
+
+
+# 7.有界内存的 Top-K 路径统计：路径里带 ID 时，不同路径可达数百万个，path_groups 会撑爆内存
+    # - Space-Saving 算法：最多只监控 capacity 个路径，新路径到来时替换计数最小的路径
+    # - 每个路径的计数只会偏大，误差不超过被替换时的最小计数（error 字段）
+    # - 真实次数超过 总数 / capacity 的路径一定会被保留下来
+    # - 可选把数字路径段归一化：/users/123/ -> /users/:id/，先合并再统计
+import heapq
+import re
+
+
+class SpaceSaving:
+    """Space-Saving 重量级元素（heavy hitters）统计
+
+    :param capacity: 最多监控的 key 数量
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.total = 0
+        # key -> [count, error]
+        self.counters = {}
+        # (count, key) 最小堆，计数只增不减，堆中记录过期时延迟更新
+        self._heap = []
+
+    def add(self, key, weight=1):
+        """记录 key 出现 weight 次"""
+        self.total += weight
+        entry = self.counters.get(key)
+        if entry is not None:
+            entry[0] += weight
+            return
+
+        if len(self.counters) < self.capacity:
+            self.counters[key] = [weight, 0]
+            heapq.heappush(self._heap, (weight, key))
+            return
+
+        # 找到真实计数最小的 key：堆顶记录过期时，用最新计数替换后重新比较
+        while True:
+            min_count, min_key = self._heap[0]
+            current = self.counters[min_key][0]
+            if current == min_count:
+                break
+            heapq.heapreplace(self._heap, (current, min_key))
+
+        del self.counters[min_key]
+        self.counters[key] = [min_count + weight, min_count]
+        heapq.heapreplace(self._heap, (min_count + weight, key))
+
+    def top(self, k):
+        """返回计数最大的 k 个 [(key, count, error), ...]，真实次数介于 count - error 与 count 之间"""
+        items = heapq.nlargest(k, self.counters.items(), key=lambda item: item[1][0])
+        return [(key, count, error) for key, (count, error) in items]
+
+
+class TopPath(NamedTuple):
+    """Top-K 路径统计结果"""
+    path: str
+    count: int
+    # 计数可能偏大的上限，真实次数 >= count - error
+    error: int
+
+
+# 每个被监控路径的大致内存占用：字典槽位、bytes 键、计数列表、堆中的元组
+_SKETCH_ENTRY_BYTES = 512
+_NUMERIC_SEGMENT_RE = re.compile(rb'/\d+(?=/|$)')
+
+
+def normalize_path(path):
+    """把路径中的纯数字段替换为 :id，path 为 bytes"""
+    return _NUMERIC_SEGMENT_RE.sub(b'/:id', path)
+
+
+def analyze_top_paths(
+        source='test_log.txt',
+        k=10,
+        by='requests',
+        memory_budget=1024 * 1024 * 64,
+        normalize=False,
+        block_size=LOG_BLOCK_SIZE,
+):
+    """在固定内存预算内统计请求最多（或慢请求最多）的 k 个路径
+
+    :param by: 排序依据，requests(请求总数)、slow(耗时大于等于 1 s 的慢请求数)
+    :param memory_budget: 统计结构的内存预算（字节），决定最多监控多少个路径
+    :param normalize: 是否把路径中的数字段归一化为 :id
+    :return: [TopPath, ...]
+    """
+    if by not in ('requests', 'slow'):
+        raise ValueError(f'Unknown top paths type: {by}')
+    min_index = 0 if by == 'requests' else PerfLevelDict.compute_level_index(PagePerfLevel.GT_1000)
+    sketch = SpaceSaving(capacity=max(k, memory_budget // _SKETCH_ENTRY_BYTES))
+
+    fp, should_close = _open_log_source(source)
+    try:
+        for block in iter_log_blocks(fp, block_size):
+            level_indexes = {}
+            for path, time_cost in iter_log_records(block):
+                index = level_indexes.get(time_cost)
+                if index is None:
+                    index = level_indexes[time_cost] = PerfLevelDict.compute_level_index(time_cost)
+                if index < min_index:
+                    continue
+                if normalize:
+                    path = normalize_path(path)
+                sketch.add(path)
+    finally:
+        if should_close:
+            fp.close()
+    return [TopPath(path.decode('utf-8'), count, error) for path, count, error in sketch.top(k)]
+
+
+def print_top_paths(top_paths):
+    """输出 Top-K 路径及其请求次数的误差范围"""
+    for top_path in top_paths:
+        print(f'== Path: {top_path.path}')
+        print(f'    Requests: {top_path.count - top_path.error} ~ {top_path.count}')
+
+# print_top_paths(analyze_top_paths('test_log.txt', k=20, by='slow', normalize=True))
+
+
+# 8.增量分析与持续跟踪（tail -f）：日志只会追加，每次只处理新增的部分
+    # - 检查点保存已处理的字节偏移、文件标识和序列化后的计数结果，下次从偏移处继续
+    # - 文件 inode 变化、长度变小或者开头内容变化时，认为日志被轮转或截断，从头开始读新文件
+    # - 只处理以换行符结尾的完整行，还没写完的半行留到下一次
+import hashlib
+import json
+
+_FINGERPRINT_SIZE = 256
+
+
+class IncrementalLogAnalyzer:
+    """增量分析访问日志，每次运行的耗时只与新增数据量有关
+
+    :param fname: 日志文件路径
+    :param checkpoint_fname: 检查点文件路径，默认为 <fname>.checkpoint.json
+    :param block_size: 每次读取的字节数
+    """
+
+    def __init__(self, fname, checkpoint_fname=None, block_size=LOG_BLOCK_SIZE):
+        self.fname = fname
+        self.checkpoint_fname = checkpoint_fname or f'{fname}.checkpoint.json'
+        self.block_size = block_size
+        self.offset = 0
+        self.inode = None
+        # 文件开头若干字节的摘要，用于识别 copytruncate 方式的轮转
+        self.fingerprint = None
+        self.fingerprint_size = 0
+        self.counters = {}
+        self.load_checkpoint()
+
+    def load_checkpoint(self):
+        """读取检查点，文件不存在时从头开始"""
+        try:
+            with open(self.checkpoint_fname, 'r') as fp:
+                checkpoint = json.load(fp)
+        except FileNotFoundError:
+            return
+        self.offset = checkpoint['offset']
+        self.inode = checkpoint['inode']
+        self.fingerprint = checkpoint['fingerprint']
+        self.fingerprint_size = checkpoint['fingerprint_size']
+        self.counters = {
+            path.encode('utf-8', 'surrogateescape'): counts
+            for path, counts in checkpoint['counters'].items()
+        }
+
+    def save_checkpoint(self):
+        """写入检查点：先写临时文件再替换，避免中途退出导致检查点损坏"""
+        checkpoint = {
+            'offset': self.offset,
+            'inode': self.inode,
+            'fingerprint': self.fingerprint,
+            'fingerprint_size': self.fingerprint_size,
+            'counters': {
+                path.decode('utf-8', 'surrogateescape'): counts
+                for path, counts in self.counters.items()
+            },
+        }
+        tmp_fname = f'{self.checkpoint_fname}.tmp'
+        with open(tmp_fname, 'w') as fp:
+            json.dump(checkpoint, fp)
+        os.replace(tmp_fname, self.checkpoint_fname)
+
+    @staticmethod
+    def _read_fingerprint(fp, size):
+        fp.seek(0)
+        head = fp.read(size)
+        return hashlib.md5(head).hexdigest(), len(head)
+
+    def _is_rotated(self, fp, stat):
+        """判断日志文件在上次运行后是否被轮转或截断"""
+        if self.inode is not None and stat.st_ino != self.inode:
+            return True
+        if stat.st_size < self.offset:
+            return True
+        if self.fingerprint is not None:
+            fingerprint, _ = self._read_fingerprint(fp, self.fingerprint_size)
+            return fingerprint != self.fingerprint
+        return False
+
+    def update(self):
+        """处理上次偏移之后新增的完整行并保存检查点
+
+        :return: 本次处理的字节数
+        """
+        with open(self.fname, 'rb') as fp:
+            stat = os.fstat(fp.fileno())
+            if self._is_rotated(fp, stat):
+                # 旧文件的统计结果继续保留，新文件从头开始读
+                self.offset = 0
+                self.fingerprint = None
+                self.fingerprint_size = 0
+            self.inode = stat.st_ino
+
+            fp.seek(self.offset)
+            processed = 0
+            for block in iter_log_blocks(fp, self.block_size, yield_tail=False):
+                aggregate_log_block(block, self.counters)
+                processed += len(block)
+            self.offset += processed
+
+            if self.fingerprint_size < _FINGERPRINT_SIZE:
+                self.fingerprint, self.fingerprint_size = self._read_fingerprint(
+                    fp, min(self.offset, _FINGERPRINT_SIZE)
+                )
+
+        if processed:
+            self.save_checkpoint()
+        return processed
+
+    def follow(self, interval=1.0):
+        """生成器：持续跟踪日志追加的内容，每处理一批新数据返回一次处理的字节数
+
+        :param interval: 没有新数据时的等待秒数
+        """
+        while True:
+            processed = self.update()
+            if processed:
+                yield processed
+            else:
+                time.sleep(interval)
+
+    def path_groups(self):
+        """返回当前累计的 {path: PerfLevelDict}"""
+        return counters_to_path_groups(self.counters)
+
+# 每分钟由定时任务执行一次：
+# analyzer = IncrementalLogAnalyzer('test_log.txt')
+# analyzer.update()
+# print_perf_report(analyzer.path_groups())
+
+# 持续跟踪：
+# for _ in analyzer.follow(interval=1):
+#     print_perf_report(analyzer.path_groups())
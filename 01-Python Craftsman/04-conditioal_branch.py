@@ -37,10 +37,16 @@
 
 import bisect
 import random
+from functools import partial
 
 class Movie:
     """电影对象数据类"""
 
+    # 已经排好序的评级分界点
+    RANK_BREAKPOINTS = (6, 7, 8, 8.5)
+    # 各评分区间级别排名
+    RANK_GRADES = ('D', 'C', 'B', 'A', 'S')
+
     def __init__(self, name, year, rating):
         self.name = name
         self.year = year
@@ -53,13 +59,8 @@ class Movie:
 
         :return:
         """
-        # 已经排好序的评级分界点
-        breakpoints = (6, 7, 8, 8.5)
-        # 各评分区间级别排名
-        grades = ('D', 'C', 'B', 'A', 'S')
-
-        index = bisect.bisect(breakpoints, float(self.rating))
-        return grades[index]
+        index = bisect.bisect(self.RANK_BREAKPOINTS, float(self.rating))
+        return self.RANK_GRADES[index]
 
 def get_sorted_movies(movies, sorting_type):
     """
@@ -85,6 +86,169 @@ def get_sorted_movies(movies, sorting_type):
     return sorted_movies
 
 
+# 1.1 批量评级：一次处理整个电影列表
+    # - 分界点与级别表提升为类属性，不再每次访问 rank 都重新创建
+    # - 安装了 NumPy 时，用 searchsorted 一次算出所有评分的级别下标（side='right' 与 bisect.bisect 一致）
+    # - 级别分布直接对下标计数（bincount），不必先生成每部电影的级别字符串
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _rank_indexes(movies):
+    """返回每部电影（或每个评分）的级别下标"""
+    if np is not None and isinstance(movies, np.ndarray):
+        ratings = movies
+    else:
+        ratings = [float(getattr(movie, 'rating', movie)) for movie in movies]
+    if np is not None:
+        return np.searchsorted(Movie.RANK_BREAKPOINTS, np.asarray(ratings, dtype=float), side='right')
+    return list(map(partial(bisect.bisect, Movie.RANK_BREAKPOINTS), ratings))
+
+
+def rank_movies(movies):
+    """
+    批量对电影分级，结果与逐个访问 Movie.rank 相同
+
+    :param movies: Movie 对象序列，或者评分序列（支持 NumPy 数组）
+    :return: 级别列表
+    """
+    indexes = _rank_indexes(movies)
+    if np is not None:
+        return np.asarray(Movie.RANK_GRADES)[indexes].tolist()
+    return [Movie.RANK_GRADES[index] for index in indexes]
+
+
+def count_grades(movies):
+    """
+    统计各个级别的电影数量，用于展示级别分布
+
+    :param movies: Movie 对象序列，或者评分序列（支持 NumPy 数组）
+    :return: {级别: 数量}，按级别从低到高排列
+    """
+    indexes = _rank_indexes(movies)
+    if np is not None:
+        counts = np.bincount(indexes, minlength=len(Movie.RANK_GRADES)).tolist()
+    else:
+        counts = [0] * len(Movie.RANK_GRADES)
+        for index in indexes:
+            counts[index] += 1
+    return dict(zip(Movie.RANK_GRADES, counts))
+
+
+# 1.2 电影目录索引：预先维护各种排序结果，避免每次请求都重新排序
+    # - 每种排序方式维护一个有序的 (排序键, 序号) 列表，序号按加入顺序递增，保证与 sorted() 一样稳定
+    # - 逆序排序（rating、year）以 (排序键, -序号) 升序保存，倒着读取即为 “键降序、加入顺序升序”
+    # - 增删电影时用 bisect.insort / bisect_left 定位，取某一页只需切片 O(k)
+    # - random 按 seed 缓存打乱后的顺序，目录变化时失效
+class MovieCatalog:
+    """维护多种预排序索引的电影目录，排序规则与 get_sorted_movies 相同"""
+
+    # sorting_type: (key_func, reverse)
+    sorting_algos = {
+        'name': (lambda movie: movie.name.lower(), False),
+        'rating': (lambda movie: movie.rating, True),
+        'year': (lambda movie: movie.year, True),
+    }
+
+    def __init__(self, movies=()):
+        # 序号 -> 电影，以及 id(电影) -> 序号
+        self._movies = {}
+        self._seqs = {}
+        self._next_seq = 1
+        self._orders = {sorting_type: [] for sorting_type in self.sorting_algos}
+        self._shuffles = {}
+        # 初始数据直接追加后整体排序一次，比逐个 insort 快
+        for movie in movies:
+            seq = self._register(movie)
+            for sorting_type, order in self._orders.items():
+                order.append(self._make_entry(sorting_type, movie, seq))
+        for order in self._orders.values():
+            order.sort()
+
+    def __len__(self):
+        return len(self._movies)
+
+    def __contains__(self, movie):
+        return id(movie) in self._seqs
+
+    def _register(self, movie):
+        # 索引按 id(电影) 记录序号，同一个对象加入两次会导致第一次的条目无法移除
+        if id(movie) in self._seqs:
+            raise ValueError(f'Movie already in catalog: {movie.name}')
+        seq = self._next_seq
+        self._next_seq += 1
+        self._movies[seq] = movie
+        self._seqs[id(movie)] = seq
+        return seq
+
+    def _make_entry(self, sorting_type, movie, seq):
+        key_func, reverse = self.sorting_algos[sorting_type]
+        return key_func(movie), -seq if reverse else seq
+
+    def add(self, movie):
+        """加入一部电影，O(log n) 查找插入位置
+
+        :raises: 同一个电影对象已经在目录中时抛出 ValueError
+        """
+        seq = self._register(movie)
+        for sorting_type, order in self._orders.items():
+            bisect.insort(order, self._make_entry(sorting_type, movie, seq))
+        self._shuffles.clear()
+
+    def remove(self, movie):
+        """移除一部电影，电影的各个排序字段在加入目录后不能修改"""
+        try:
+            seq = self._seqs.pop(id(movie))
+        except KeyError:
+            raise ValueError(f'Movie not in catalog: {movie.name}')
+        del self._movies[seq]
+        for sorting_type, order in self._orders.items():
+            entry = self._make_entry(sorting_type, movie, seq)
+            del order[bisect.bisect_left(order, entry)]
+        self._shuffles.clear()
+
+    def page(self, sorting_type, offset=0, limit=None, seed=None):
+        """
+        按排序方式返回一页电影，耗时只与 limit 有关
+
+        :param sorting_type: 排序选项，可选值：name(名称)、rating(评分)、year(年份)、random(随机乱序)
+        :param seed: random 排序的随机种子，相同种子返回同样的顺序；为 None 时每次都重新打乱
+        """
+        if sorting_type != 'random' and sorting_type not in self.sorting_algos:
+            raise RuntimeError(f'Unknow sorting type: {sorting_type}')
+        total = len(self._movies)
+        stop = total if limit is None else min(offset + limit, total)
+        if offset >= stop:
+            return []
+
+        if sorting_type == 'random':
+            return [self._movies[seq] for seq in self._get_shuffle(seed)[offset:stop]]
+        _, reverse = self.sorting_algos[sorting_type]
+        order = self._orders[sorting_type]
+        if reverse:
+            entries = reversed(order[total - stop:total - offset])
+        else:
+            entries = order[offset:stop]
+        return [self._movies[abs(seq)] for _, seq in entries]
+
+    def get_sorted_movies(self, sorting_type, seed=None):
+        """返回完整的排序结果"""
+        return self.page(sorting_type, seed=seed)
+
+    def _get_shuffle(self, seed):
+        if seed is None:
+            seqs = list(self._movies)
+            random.shuffle(seqs)
+            return seqs
+        seqs = self._shuffles.get(seed)
+        if seqs is None:
+            seqs = self._shuffles[seed] = list(self._movies)
+            random.Random(seed).shuffle(seqs)
+        return seqs
+
+
 # 2.尽量降低分支内代码的相似性
 def create_or_update():
     if user.no_profile_exists:
@@ -131,6 +131,9 @@ with create_conn_obj(host, port, timeout=None) as conn:
 
 
 # 3.使用上下管理器: 忽略已经关闭的连接异常
+class AlreadyClosedError(Exception):
+    """连接已经被关闭"""
+
 class ignore_closed:
     """忽略已经关闭的连接"""
     def __enter__(self):
@@ -157,6 +160,441 @@ def create_conn_obj(host, port, timeout=None):
         conn.close()  # 类似于 __exit__
 
 
+# 4.1 连接池：复用 create_conn 创建的连接，用法与 create_conn_obj 相同
+    # - 每次 with create_conn_obj(...) 都要重新建立 TCP 连接、握手，高并发时开销很大
+    # - with pool.connection() as conn: 退出时把连接放回池中，而不是关闭
+    # - 最少保持 min_size 个连接，最多 max_size 个；空闲超过 idle_timeout 秒的多余连接会被关闭
+    # - 取出连接时执行健康检查，检查或使用过程中抛出 AlreadyClosedError 的连接直接丢弃（参考 ignore_closed）
+    # - 连接数用满时进入等待队列，记录等待次数、耗时与超时次数
+    # - 协程中使用 async with pool.aconnection() as conn:，每个等待的协程持有一个 asyncio Future，
+    #   连接放回时通过 call_soon_threadsafe 唤醒，不占用线程；新建连接、健康检查与关闭连接等阻塞操作
+    #   放在默认线程池中执行，不阻塞事件循环；协程被取消时不会遗留连接
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from functools import partial
+
+
+class PoolError(Exception):
+    """连接池相关错误"""
+
+class PoolTimeoutError(PoolError):
+    """等待可用连接超时"""
+
+class PoolClosedError(PoolError):
+    """连接池已经关闭"""
+
+
+# _try_checkout() 的返回值：没有可用的连接或名额
+_NO_CONNECTION = object()
+
+
+class PoolStats:
+    """连接池统计数据"""
+
+    def __init__(self):
+        self.created_count = 0
+        # 健康检查失败或使用中发现已关闭而丢弃的连接数
+        self.evicted_count = 0
+        self.idle_closed_count = 0
+        # 等待队列
+        self.waiting = 0
+        self.max_waiting = 0
+        self.wait_count = 0
+        self.wait_seconds = 0.0
+        self.timeout_count = 0
+
+
+class ConnectionPool:
+    """线程安全的连接池
+
+    :param host: 主机地址
+    :param port: 端口
+    :param timeout: 创建连接的超时时间
+    :param min_size: 最少保持的连接数
+    :param max_size: 最多同时打开的连接数
+    :param idle_timeout: 空闲连接的最长保留秒数，为 None 时不关闭空闲连接
+    :param acquire_timeout: 等待可用连接的默认超时秒数，为 None 时一直等待
+    :param health_check: 取出连接时调用 health_check(conn)，返回 False 或抛出 AlreadyClosedError 表示连接不可用
+    :param factory: 创建连接的函数，默认为 create_conn(host, port, timeout=timeout)
+    """
+
+    def __init__(
+            self,
+            host=None,
+            port=None,
+            timeout=None,
+            *,
+            min_size=1,
+            max_size=10,
+            idle_timeout=300,
+            acquire_timeout=None,
+            health_check=None,
+            factory=None,
+    ):
+        self._factory = factory or partial(create_conn, host, port, timeout=timeout)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self.health_check = health_check
+        self.stats = PoolStats()
+
+        # (conn, 放回时间)，右端是最近放回的连接
+        self._idle = deque()
+        # 已打开的连接数，包括空闲和正在使用的
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        # 等待中的协程：(事件循环, Future)
+        self._async_waiters = deque()
+        for _ in range(min_size):
+            self._idle.append((self._create(), time.monotonic()))
+            self._size += 1
+
+    def _create(self):
+        conn = self._factory()
+        with self._cond:
+            self.stats.created_count += 1
+        return conn
+
+    @staticmethod
+    def _close_conn(conn):
+        with ignore_closed():
+            conn.close()
+
+    def _close_expired_idle(self):
+        """关闭空闲太久的连接，至少保留 min_size 个，需在持有锁时调用"""
+        if self.idle_timeout is None:
+            return
+        expired_before = time.monotonic() - self.idle_timeout
+        while self._idle and self._size > self.min_size and self._idle[0][1] < expired_before:
+            conn, _ = self._idle.popleft()
+            self._size -= 1
+            self.stats.idle_closed_count += 1
+            self._close_conn(conn)
+
+    def _try_checkout(self):
+        """不等待地取出连接，需在持有锁时调用
+
+        :return: 空闲连接；None 表示已经预留了名额，由调用方新建连接；_NO_CONNECTION 表示需要等待
+        """
+        if self._closed:
+            raise PoolClosedError('connection pool is closed')
+        if self._idle:
+            return self._idle.pop()[0]
+        if self._size < self.max_size:
+            self._size += 1
+            return None
+        return _NO_CONNECTION
+
+    def _start_waiting(self):
+        self.stats.wait_count += 1
+        self.stats.waiting += 1
+        self.stats.max_waiting = max(self.stats.max_waiting, self.stats.waiting)
+        return time.monotonic()
+
+    def _stop_waiting(self, wait_started):
+        self.stats.waiting -= 1
+        self.stats.wait_seconds += time.monotonic() - wait_started
+
+    def _checkout(self, deadline):
+        """取出一个空闲连接；返回 None 表示已经预留了名额，由调用方新建连接"""
+        with self._cond:
+            self._close_expired_idle()
+            wait_started = None
+            try:
+                while True:
+                    conn = self._try_checkout()
+                    if conn is not _NO_CONNECTION:
+                        return conn
+
+                    if wait_started is None:
+                        wait_started = self._start_waiting()
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self.stats.timeout_count += 1
+                        raise PoolTimeoutError('timed out waiting for a connection')
+                    self._cond.wait(remaining)
+            finally:
+                if wait_started is not None:
+                    self._stop_waiting(wait_started)
+
+    def _notify(self):
+        """有连接或名额可用时，唤醒一个等待的线程和一个等待的协程，需在持有锁时调用"""
+        self._cond.notify()
+        if self._async_waiters:
+            loop, waiter = self._async_waiters.popleft()
+            loop.call_soon_threadsafe(self._wake_async_waiter, waiter)
+
+    def _wake_async_waiter(self, waiter):
+        if waiter.done():
+            # 协程已经超时或被取消，把这次唤醒转交给下一个等待者
+            with self._cond:
+                self._notify()
+        else:
+            waiter.set_result(None)
+
+    def _is_healthy(self, conn):
+        if self.health_check is None:
+            return True
+        try:
+            return self.health_check(conn) is not False
+        except AlreadyClosedError:
+            return False
+
+    def acquire(self, timeout=None):
+        """取出一个可用连接，用完后必须调用 release() 或 discard()
+
+        :param timeout: 等待超时秒数，默认使用 acquire_timeout
+        :raises: 超时抛出 PoolTimeoutError，连接池关闭后抛出 PoolClosedError
+        """
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            conn = self._checkout(deadline)
+            if conn is None:
+                try:
+                    return self._create()
+                except BaseException:
+                    self._release_slot()
+                    raise
+            if self._is_healthy(conn):
+                return conn
+            self.discard(conn)
+
+    def release(self, conn):
+        """把连接放回池中"""
+        with self._cond:
+            if self._closed:
+                self._size -= 1
+                self._close_conn(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._notify()
+
+    def discard(self, conn):
+        """关闭并丢弃一个不可用的连接"""
+        self._close_conn(conn)
+        with self._cond:
+            self.stats.evicted_count += 1
+        self._release_slot()
+
+    def _release_slot(self):
+        with self._cond:
+            self._size -= 1
+            self._notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """取出连接，退出上下文时自动放回；使用中抛出 AlreadyClosedError 时丢弃该连接"""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        except AlreadyClosedError:
+            self.discard(conn)
+            raise
+        except BaseException:
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    async def acquire_async(self, timeout=None):
+        """协程版本的 acquire()，在事件循环中等待可用连接，新建连接与健康检查放在默认线程池中执行"""
+        loop = asyncio.get_running_loop()
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            conn = await self._checkout_async(loop, deadline)
+            if conn is None:
+                return await self._create_async(loop)
+            if self.health_check is None or await self._check_health_async(loop, conn):
+                return conn
+            await self._discard_async(loop, conn)
+
+    async def _checkout_async(self, loop, deadline):
+        wait_started = None
+        try:
+            while True:
+                with self._cond:
+                    self._close_expired_idle()
+                    conn = self._try_checkout()
+                    if conn is not _NO_CONNECTION:
+                        return conn
+                    if wait_started is None:
+                        wait_started = self._start_waiting()
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self.stats.timeout_count += 1
+                        raise PoolTimeoutError('timed out waiting for a connection')
+                    waiter = loop.create_future()
+                    self._async_waiters.append((loop, waiter))
+
+                try:
+                    await asyncio.wait_for(waiter, remaining)
+                except asyncio.TimeoutError:
+                    pass
+                except BaseException:
+                    # 已被唤醒却被取消时，把唤醒转交给下一个等待者
+                    with self._cond:
+                        if waiter.done() and not waiter.cancelled():
+                            self._notify()
+                    raise
+                finally:
+                    with self._cond:
+                        if (loop, waiter) in self._async_waiters:
+                            self._async_waiters.remove((loop, waiter))
+        finally:
+            if wait_started is not None:
+                with self._cond:
+                    self._stop_waiting(wait_started)
+
+    async def _create_async(self, loop):
+        """在线程池中新建连接；协程被取消时，连接建好后放回池中"""
+        future = loop.run_in_executor(None, self._create)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            future.add_done_callback(self._release_created)
+            raise
+        except BaseException:
+            self._release_slot()
+            raise
+
+    async def _check_health_async(self, loop, conn):
+        """在线程池中执行健康检查；协程被取消时，检查完成后放回或丢弃连接"""
+        future = loop.run_in_executor(None, self._is_healthy, conn)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            future.add_done_callback(partial(self._release_checked, conn))
+            raise
+        except BaseException:
+            await self._discard_async(loop, conn)
+            raise
+
+    def _release_checked(self, conn, future):
+        if not future.cancelled() and future.exception() is None and future.result():
+            self.release(conn)
+        else:
+            self.discard(conn)
+
+    async def _discard_async(self, loop, conn):
+        """在线程池中关闭并丢弃连接；协程被取消时丢弃操作仍会完成"""
+        await asyncio.shield(loop.run_in_executor(None, self.discard, conn))
+
+    def _release_created(self, future):
+        if future.cancelled() or future.exception() is not None:
+            self._release_slot()
+        else:
+            self.release(future.result())
+
+    @asynccontextmanager
+    async def aconnection(self, timeout=None):
+        """协程版本的 connection()"""
+        conn = await self.acquire_async(timeout)
+        try:
+            yield conn
+        except AlreadyClosedError:
+            await self._discard_async(asyncio.get_running_loop(), conn)
+            raise
+        except BaseException:
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def close(self):
+        """关闭连接池与所有空闲连接，正在使用的连接会在放回时关闭"""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._size -= 1
+                self._close_conn(conn)
+            self._cond.notify_all()
+            while self._async_waiters:
+                loop, waiter = self._async_waiters.popleft()
+                loop.call_soon_threadsafe(self._wake_async_waiter, waiter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+'''
+>>> pool = ConnectionPool(host, port, min_size=2, max_size=20, idle_timeout=60, acquire_timeout=5)
+>>> with pool.connection() as conn:
+...     conn.send_text('Hello, world!')
+>>> pool.stats.wait_count, pool.stats.timeout_count
+'''
+
+
+def check_connection_pool():
+    """在本进程内启动回显服务器，校验连接复用、等待超时、丢弃已关闭连接以及协程取消后不泄漏连接"""
+    import socket
+    import socketserver
+
+    class EchoHandler(socketserver.BaseRequestHandler):
+        def handle(self):
+            while data := self.request.recv(1024):
+                self.request.sendall(data)
+
+    def check_alive(conn):
+        if conn.fileno() == -1:
+            raise AlreadyClosedError()
+
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), EchoHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    factory = partial(socket.create_connection, server.server_address)
+    try:
+        with ConnectionPool(min_size=1, max_size=2, health_check=check_alive, factory=factory) as pool:
+            with pool.connection() as conn:
+                conn.sendall(b'hello')
+                assert conn.recv(1024) == b'hello'
+            with pool.connection() as reused:
+                assert reused is conn
+            assert pool.stats.created_count == 1
+
+            held = [pool.acquire(), pool.acquire()]
+            try:
+                pool.acquire(timeout=0.05)
+            except PoolTimeoutError:
+                assert pool.stats.timeout_count == 1
+            else:
+                raise AssertionError('acquire() should time out when the pool is full')
+
+            # 已关闭的连接在取出时被丢弃，并重新建立连接
+            held[0].close()
+            pool.release(held[0])
+            assert pool.acquire(timeout=1) is not held[0]
+            assert pool.stats.evicted_count == 1
+
+            async def cancel_waiter():
+                waiter = asyncio.ensure_future(pool.acquire_async())
+                await asyncio.sleep(0.01)
+                waiter.cancel()
+                await asyncio.gather(waiter, return_exceptions=True)
+                pool.release(held[1])
+                async with pool.aconnection(timeout=0.3) as conn:
+                    conn.sendall(b'async')
+                    assert conn.recv(1024) == b'async'
+
+            asyncio.run(cancel_waiter())
+            assert not pool._async_waiters
+    finally:
+        server.shutdown()
+        server.server_close()
+
+# check_connection_pool()
+
+
 # 5.使用 pydantic 库校验输入数据
 from pydantic import BaseModel, conint, ValidationError
 
@@ -175,4 +613,157 @@ def input_a_number_with_pydantic():
             continue
         number = number_input.number
         break
-    print(f'Your number is {number}')
\ No newline at end of file
+    print(f'Your number is {number}')
+
+
+# 5.1 批量校验：一次校验整个列表，不再为每个数字实例化一次 NumberInput
+    # - 用 TypeAdapter(list[...]) 复用 NumberInput.number 的类型注解，整个列表只进入一次 pydantic 校验
+    # - 注解只是 conint 的取值范围时，安装了 NumPy 后直接对整型（或整数值的浮点）数组做向量化上下界检查
+    # - 不为每个非法数字抛出 ValidationError，而是返回合法值与非法值下标数组
+from typing import NamedTuple
+
+from annotated_types import Ge, Gt, Interval, Le, Lt
+from pydantic import TypeAdapter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class NumberBatch(NamedTuple):
+    """批量校验结果
+
+    :param values: 按原顺序排列的合法值，走 NumPy 快速路径时为 int64 数组，否则为列表
+    :param error_indexes: 非法值在输入中的下标（int64 数组，未安装 NumPy 时为列表）
+    """
+
+    values: object
+    error_indexes: object
+
+
+class NumberBatchValidator:
+    """批量校验某个模型字段的取值
+
+    :param model: pydantic 模型
+    :param field_name: 字段名
+    """
+
+    def __init__(self, model=NumberInput, field_name='number'):
+        field = model.model_fields[field_name]
+        self.annotation = field.rebuild_annotation()
+        self.adapter = TypeAdapter(list[self.annotation])
+        self.bounds = self._get_int_bounds(field)
+
+    @staticmethod
+    def _get_int_bounds(field):
+        """取出 conint 的闭区间上下界；有 strict、multiple_of 等其他约束时返回 None"""
+        if field.annotation is not int:
+            return None
+        low, high = -2 ** 63, 2 ** 63 - 1
+        for item in field.metadata:
+            if item is None:
+                continue
+            if not isinstance(item, (Interval, Ge, Gt, Le, Lt)):
+                return None
+            if getattr(item, 'ge', None) is not None:
+                low = max(low, item.ge)
+            if getattr(item, 'gt', None) is not None:
+                low = max(low, item.gt + 1)
+            if getattr(item, 'le', None) is not None:
+                high = min(high, item.le)
+            if getattr(item, 'lt', None) is not None:
+                high = min(high, item.lt - 1)
+        return low, high
+
+    def validate(self, values):
+        """校验 values（列表或数组），返回 NumberBatch"""
+        if np is not None and self.bounds is not None:
+            array = values if isinstance(values, np.ndarray) else self._as_numeric_array(values)
+            if array is not None and array.ndim == 1 and array.dtype.kind in 'biuf':
+                return self._validate_array(array)
+        return self._validate_list(list(values))
+
+    @staticmethod
+    def _as_numeric_array(values):
+        # 字符串等需要 pydantic 做宽松转换的输入不走快速路径
+        try:
+            array = np.asarray(values)
+        except (ValueError, OverflowError):
+            return None
+        return array if array.dtype.kind in 'biuf' else None
+
+    def _validate_array(self, array):
+        low, high = self.bounds
+        if array.dtype.kind == 'f':
+            # 与 pydantic 的宽松模式一致：只接受小数部分为 0 的有限浮点数
+            with np.errstate(invalid='ignore'):
+                ok = np.isfinite(array) & (array == np.floor(array)) & (array >= low) & (array <= high)
+        elif array.dtype.kind == 'u':
+            ok = array <= high if low <= 0 else (array >= low) & (array <= high)
+        else:
+            ok = (array >= low) & (array <= high)
+        if ok.all():
+            return NumberBatch(array.astype(np.int64), np.empty(0, dtype=np.int64))
+        return NumberBatch(array[ok].astype(np.int64), np.flatnonzero(~ok))
+
+    def _validate_list(self, values):
+        try:
+            return NumberBatch(self.adapter.validate_python(values), self._make_indexes([]))
+        except ValidationError as e:
+            bad = sorted({error['loc'][0] for error in e.errors(include_url=False, include_input=False)})
+        # 剩下的值一定能通过校验，再校验一次以得到转换后的值
+        bad_set = set(bad)
+        valid = self.adapter.validate_python([v for i, v in enumerate(values) if i not in bad_set])
+        return NumberBatch(valid, self._make_indexes(bad))
+
+    @staticmethod
+    def _make_indexes(indexes):
+        return np.array(indexes, dtype=np.int64) if np is not None else indexes
+
+
+number_batch_validator = NumberBatchValidator()
+
+
+def validate_numbers(values):
+    """批量校验 NumberInput.number，返回合法值与非法值下标
+
+    >>> validate_numbers(['3', 120, 'x', 7.0])
+    NumberBatch(values=[3, 7], error_indexes=array([1, 2]))
+    """
+    return number_batch_validator.validate(values)
+
+
+def bench_validate_numbers(count=1000000):
+    """对比逐个实例化 NumberInput 与批量校验的耗时"""
+    import random
+    import time
+
+    numbers = [random.randint(-10, 110) for _ in range(count)]
+
+    def validate_one_by_one():
+        valid, error_indexes = [], []
+        for i, number in enumerate(numbers):
+            try:
+                valid.append(NumberInput(number=number).number)
+            except ValidationError:
+                error_indexes.append(i)
+        return len(valid), len(error_indexes)
+
+    def validate_list():
+        batch = number_batch_validator._validate_list(numbers)
+        return len(batch.values), len(batch.error_indexes)
+
+    def validate_array():
+        batch = validate_numbers(np.array(numbers))
+        return len(batch.values), len(batch.error_indexes)
+
+    cases = [('NumberInput', validate_one_by_one), ('TypeAdapter', validate_list)]
+    if np is not None:
+        cases.append(('NumPy', validate_array))
+    for name, func in cases:
+        st = time.perf_counter()
+        valid_count, error_count = func()
+        print(f'{name}: {valid_count} valid, {error_count} errors, {time.perf_counter() - st:.3f} seconds')
+
+# bench_validate_numbers()
@@ -66,7 +66,53 @@ class Range7:
 
     def __iter__(self):
         # 返回一个新的迭代器对象
-        return Range7Iterator(self)
+        # 负数部分沿用逐个判断的 Range7Iterator，非负部分用 1.1 中按数字块跳跃的迭代器
+        if self.start >= 0:
+            return iter_range7(self.start, self.end)
+        negatives = Range7Iterator(Range7(self.start, min(self.end, 0)))
+        return chain(negatives, iter_range7(0, self.end))
+
+    def __len__(self):
+        return count_range7(self.start, self.end)
+
+    def __getitem__(self, index):
+        """返回第 index 个有效数字，支持负数下标，O(log² n)"""
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError('Range7 index out of range')
+
+        # 负数 x 有效等价于 -x 有效：范围内的负数按从大到小映射为正数 y = -x
+        neg_end = min(self.end, 0)
+        neg_count = count_range7(self.start, neg_end)
+        if index < neg_count:
+            rank = _count_valid_below(1 - neg_end) + neg_count - 1 - index
+            return -_kth_valid(rank)
+        return _kth_valid(_count_valid_below(max(self.start, 0)) + index - neg_count)
+
+    def __contains__(self, num):
+        if not isinstance(num, int) or not self.start <= num < self.end:
+            return False
+        return num != 0 and (num % 7 == 0 or '7' in str(num))
+
+    def __repr__(self):
+        return f'Range7({self.start}, {self.end})'
+
+    def _split_at(self, indexes):
+        """在第 index 个有效数字处切开，返回子范围列表"""
+        bounds = [self.start] + [self[index] for index in indexes] + [self.end]
+        return [Range7(start, end) for start, end in zip(bounds, bounds[1:])]
+
+    def split(self, n):
+        """按有效数字的个数（而不是数值宽度）把范围均分为最多 n 个子范围"""
+        length = len(self)
+        parts = min(n, length) or 1
+        return self._split_at(length * i // parts for i in range(1, parts))
+
+    def chunks(self, chunk_size):
+        """把范围切分为每段包含 chunk_size 个有效数字的子范围（最后一段可能不足）"""
+        return self._split_at(range(chunk_size, len(self), chunk_size))
 
 class Range7Iterator:
     def __init__(self, range_obj):
@@ -93,6 +139,181 @@ class Range7Iterator:
         return num % 7 == 0 or '7' in str(num)
 
 
+# 1.1 Range7 的算术加速：数位 DP 计数 + 按数字块跳跃迭代
+    # - Range7Iterator 每个数字都要 str() 一次，遍历 Range7(0, 10 ** 9) 需要很久
+    # - 计数：[0, n) 中 “不含 7 且不能被 7 整除” 的数，可以按数位逐位统计（数位 DP），其余都有效
+    # - 第 k 个有效数字：在计数函数上二分查找；有效数字的间隔不超过 7，查找范围有上界
+    # - 迭代：按 10 的幂对齐切块，前缀含 7 的整块全部有效，直接返回 range，不再逐个判断
+from itertools import chain, starmap
+
+_NO7_DIGITS = (0, 1, 2, 3, 4, 5, 6, 8, 9)
+# _no7_residues[length][r]：长度为 length（允许前导零）、不含 7 的数字串中，模 7 余 r 的个数
+_no7_residues = [[1, 0, 0, 0, 0, 0, 0]]
+
+
+def _no7_residue_counts(length):
+    while len(_no7_residues) <= length:
+        prev_length = len(_no7_residues) - 1
+        prev, counts = _no7_residues[-1], [0] * 7
+        weight = pow(10, prev_length, 7)
+        for digit in _NO7_DIGITS:
+            for residue, count in enumerate(prev):
+                counts[(digit * weight + residue) % 7] += count
+        _no7_residues.append(counts)
+    return _no7_residues[length]
+
+
+def _count_valid_below(n):
+    """返回 [0, n) 中可被 7 整除或包含 7 的正整数个数，n 为非负数"""
+    if n <= 0:
+        return 0
+    digits = str(n)
+    invalid_count = 0
+    prefix = 0
+    for i, char in enumerate(digits):
+        rest = len(digits) - i - 1
+        counts = _no7_residue_counts(rest)
+        weight = pow(10, rest, 7)
+        current = int(char)
+        # 当前位取比 current 小的数字时，后面的位可以任意取值（不含 7）
+        for digit in _NO7_DIGITS:
+            if digit >= current:
+                break
+            base = (prefix * 10 + digit) * weight
+            invalid_count += sum(count for residue, count in enumerate(counts) if (base + residue) % 7)
+        if current == 7:
+            break
+        prefix = (prefix * 10 + current) % 7
+    # 0 不含 7 且能被 7 整除，但不算有效数字
+    return n - invalid_count - 1
+
+
+def _kth_valid(k):
+    """返回第 k 个（从 0 开始）可被 7 整除或包含 7 的正整数"""
+    low, high = 1, 7 * (k + 1)
+    while low < high:
+        mid = (low + high) // 2
+        if _count_valid_below(mid + 1) > k:
+            high = mid
+        else:
+            low = mid + 1
+    return low
+
+
+def count_range7(start, end):
+    """返回 [start, end) 中可被 7 整除或包含 7 的数字个数"""
+    if end <= start:
+        return 0
+    if start >= 0:
+        return _count_valid_below(end) - _count_valid_below(start)
+    # 负数部分 [start, min(end, 0)) 对应正数 [1 - min(end, 0), -start]
+    neg_end = min(end, 0)
+    return (_count_valid_below(1 - start) - _count_valid_below(1 - neg_end)
+            + _count_valid_below(max(end, 0)))
+
+
+# 前缀不含 7 的 1000 个数中，有效数字的分布只取决于块起点模 7 的余数，预先算好各余数下的区间
+_LEAF_BLOCK_SIZE = 1000
+_leaf_block_runs = {}
+
+
+def _get_leaf_block_runs(residue):
+    runs = _leaf_block_runs.get(residue)
+    if runs is None:
+        runs = []
+        for offset in range(_LEAF_BLOCK_SIZE):
+            if (residue + offset) % 7 and '7' not in str(offset):
+                continue
+            if runs and runs[-1][1] == offset:
+                runs[-1][1] = offset + 1
+            else:
+                runs.append([offset, offset + 1])
+        runs = _leaf_block_runs[residue] = [tuple(run) for run in runs]
+    return runs
+
+
+def _iter_block_runs(base, size, has_seven):
+    """返回 [base, base + size) 中有效数字的连续区间 (start, stop)，size 为 10 的幂
+
+    :param has_seven: 该块的公共前缀是否已经包含 7
+    """
+    if has_seven:
+        yield base, base + size
+    elif size < _LEAF_BLOCK_SIZE:
+        # 只会出现在范围两端，数量有限，逐个判断即可
+        for num in range(base, base + size):
+            if num and (num % 7 == 0 or '7' in str(num)):
+                yield num, num + 1
+    elif size == _LEAF_BLOCK_SIZE:
+        for run_start, run_stop in _get_leaf_block_runs(base % 7):
+            # 0 不算有效数字，它后面的 1 也无效，所以 (0, 1) 单独成为一个区间
+            if base or run_start:
+                yield base + run_start, base + run_stop
+    else:
+        sub_size = size // 10
+        for digit in range(10):
+            yield from _iter_block_runs(base + digit * sub_size, sub_size, digit == 7)
+
+
+def _iter_valid_runs(start, end):
+    """把 [start, end) 切分为按 10 的幂对齐的块，逐块返回有效数字的连续区间"""
+    num = start
+    while num < end:
+        size = 1
+        while num % (size * 10) == 0 and num + size * 10 <= end:
+            size *= 10
+        yield from _iter_block_runs(num, size, '7' in str(num // size))
+        num += size
+
+
+def iter_range7(start, end):
+    """按顺序返回 [start, end) 中的有效数字，start 为非负数"""
+    # 把每个区间转换为 range，再由 chain 在 C 层面展开
+    return chain.from_iterable(starmap(range, _iter_valid_runs(start, end)))
+
+"""
+>>> r = Range7(0, 10 ** 9)
+>>> len(r)
+667925294
+>>> r[10 ** 8]
+162760652
+>>> 162760652 in r
+True
+"""
+
+
+# 1.2 多进程并行处理 Range7：按有效数字的个数切分，保证各进程负载均衡
+    # - 有效数字在数值上分布不均匀（含 7 的数字成片出现），按宽度切分会导致负载不均
+    # - split()/chunks() 借助 __getitem__ 直接定位切分点，无须遍历
+    # - func 与子范围都会被 pickle 传给子进程，func 需要是模块级函数
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def map_range7(func, range_obj, processes=None, chunk_size=None):
+    """生成器：在进程池中对 range_obj 的各个子范围执行 func(sub_range)，按子范围顺序返回结果
+
+    :param processes: 进程数，默认为 CPU 核数
+    :param chunk_size: 每个子范围包含的有效数字个数，默认把范围均分为 processes 份
+    """
+    processes = processes or os.cpu_count() or 1
+    if chunk_size:
+        sub_ranges = range_obj.chunks(chunk_size)
+    else:
+        sub_ranges = range_obj.split(processes)
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        yield from executor.map(func, sub_ranges)
+
+"""
+>>> Range7(0, 100).split(3)
+[Range7(0, 49), Range7(49, 75), Range7(75, 100)]
+>>> def shard_sum(sub_range):
+...     return sum(sub_range)
+>>> sum(map_range7(shard_sum, Range7(0, 10 ** 7), processes=4)) == sum(Range7(0, 10 ** 7))
+True
+"""
+
+
 # 2.使用生成器函数修饰可迭代对象: enumerate() 函数的思路
 def sum_even_only(numbers):
     """对 numbers 里面所有偶数求和"""
@@ -133,6 +354,115 @@ def find_twelve_v2(num_list1, num_list2, num_list3):
         if num1 + num2 + num3 == 12:
             return num1, num2, num3
 
+# 3.1 在更大的输入上寻找 “三数之和”：用哈希表替代最内层循环
+    # - product() 只是把嵌套拍平，复杂度仍是 O(n³)，每个列表上万个元素时无法接受
+    # - 用 Counter 记录第三个列表里每个数出现的次数，内层只需一次哈希查找，复杂度降为 O(n²)
+    # - 安装了 NumPy 时，对第三个列表排序，每个 num1 对整个第二个列表做一次向量化二分查找
+    # - 三个列表与 target 都是整数时，first 模式与 find_twelve 的结果完全一致；all 模式按 product() 的顺序惰性返回所有组合
+    # - 含有浮点数等其他类型时，target - num1 - num2 与 num1 + num2 + num3 的舍入误差不同，
+    #   哈希查找可能找到不同的组合，此时退回到与 find_twelve 相同的逐个求和比较
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 保证 num1 + num2 + num3 的计算不会超出 int64 范围
+_INT64_SAFE_LIMIT = 2 ** 61
+
+
+def _fits_int64(nums):
+    return all(isinstance(num, int) and -_INT64_SAFE_LIMIT < num < _INT64_SAFE_LIMIT for num in nums)
+
+
+def _all_ints(nums):
+    return all(isinstance(num, int) for num in nums)
+
+
+def _iter_triplets(num_list1, num_list2, num_list3, target):
+    """生成器：按 product() 的顺序返回所有和为 target 的组合（包括重复的数字）"""
+    counter3 = Counter(num_list3)
+    for num1 in num_list1:
+        for num2 in num_list2:
+            num3 = target - num1 - num2
+            for _ in range(counter3.get(num3, 0)):
+                yield num1, num2, num3
+
+
+def _find_triplet_numpy(num_list1, num_list2, num_list3, target, mode):
+    """NumPy 版本：每个 num1 对应一次向量化的 searchsorted"""
+    arr2 = np.asarray(num_list2, dtype=np.int64)
+    sorted3 = np.sort(np.asarray(num_list3, dtype=np.int64))
+    if not len(arr2) or not len(sorted3):
+        return None if mode == 'first' else 0
+
+    count = 0
+    for num1 in num_list1:
+        need = target - num1 - arr2
+        left = np.searchsorted(sorted3, need, side='left')
+        if mode == 'count':
+            count += int((np.searchsorted(sorted3, need, side='right') - left).sum())
+            continue
+        found = sorted3[np.minimum(left, len(sorted3) - 1)] == need
+        if found.any():
+            # argmax 返回第一个 True 的位置，保持与 product() 相同的先后顺序
+            index = int(found.argmax())
+            return num1, num_list2[index], int(need[index])
+    return None if mode == 'first' else count
+
+
+def find_triplet_sum(lists, target=12, mode='first'):
+    """从 3 个数字列表中（每个列表各取一个数），寻找和为 target 的组合
+
+    :param lists: 3 个数字列表
+    :param target: 目标和
+    :param mode: first(返回第一组，找不到时返回 None)、all(返回所有组合的生成器)、count(返回组合数量)
+    """
+    if mode not in ('first', 'all', 'count'):
+        raise ValueError(f'Unknown mode: {mode}')
+    num_list1, num_list2, num_list3 = lists
+    if not all(_all_ints(nums) for nums in (num_list1, num_list2, num_list3, [target])):
+        triplets = (
+            (num1, num2, num3) for num1, num2, num3 in product(num_list1, num_list2, num_list3)
+            if num1 + num2 + num3 == target
+        )
+        if mode == 'all':
+            return triplets
+        if mode == 'first':
+            return next(triplets, None)
+        return sum(1 for _ in triplets)
+
+    if mode == 'all':
+        return _iter_triplets(num_list1, num_list2, num_list3, target)
+
+    if np is not None and all(_fits_int64(nums) for nums in (num_list1, num_list2, num_list3, [target])):
+        return _find_triplet_numpy(num_list1, num_list2, num_list3, target, mode)
+    if mode == 'first':
+        return next(_iter_triplets(num_list1, num_list2, num_list3, target), None)
+    counter3 = Counter(num_list3)
+    return sum(counter3.get(target - num1 - num2, 0) for num1 in num_list1 for num2 in num_list2)
+
+
+def bench_find_triplet(size=300):
+    """对比 find_twelve、find_twelve_v2 与 find_triplet_sum 的耗时（找不到结果时为最坏情况）"""
+    import random
+    import time
+
+    lists = [[random.randint(100, 10000) for _ in range(size)] for _ in range(3)]
+    funcs = {
+        'find_twelve': lambda: find_twelve(*lists),
+        'find_twelve_v2': lambda: find_twelve_v2(*lists),
+        'find_triplet_sum': lambda: find_triplet_sum(lists),
+    }
+    for name, func in funcs.items():
+        st = time.perf_counter()
+        func()
+        print(f'{name}: {time.perf_counter() - st:.3f} seconds')
+
+# bench_find_triplet(300)
+
+
 # 4.循环中的else子句
 def foo():
     for i in range(7):
@@ -214,3 +544,290 @@ def count_even_groups(fname):
             if int(num) % 2 == 0:
                 counter[num] += 1
     return counter
+
+
+# 5.2 数字统计的快速版本：二进制模式读取 + bytes 内置方法批量计数
+    # - 逐字符 isdigit() 只有几 MB/s，改为在 C 层面处理整个块
+    # - bytes.translate(None, delete) 删除所有非数字字节，剩下的长度就是数字个数
+    # - 安装了 NumPy 时，用 frombuffer + bincount 一次算出每个数字的出现次数
+    # - 注意：只统计 ASCII 数字 0～9，str.isdigit() 还会把 '²'、'٣' 之类的字符算进去
+# np 已在 3.1 中导入，没有安装 NumPy 时为 None
+DIGIT_BLOCK_SIZE = 1024 * 1024
+
+_DIGIT_BYTES = b'0123456789'
+_NON_DIGIT_BYTES = bytes(b for b in range(256) if b not in _DIGIT_BYTES)
+
+
+def digit_histogram(chunk):
+    """返回 chunk 中 0～9 每个数字出现的次数，长度为 10 的列表"""
+    if np is not None:
+        counts = np.bincount(np.frombuffer(chunk, dtype=np.uint8), minlength=256)
+        return counts[_DIGIT_BYTES[0]:_DIGIT_BYTES[-1] + 1].tolist()
+    digits = chunk.translate(None, _NON_DIGIT_BYTES)
+    return [digits.count(d) for d in _DIGIT_BYTES]
+
+
+def count_digits_fast(fname, block_size=DIGIT_BLOCK_SIZE, per_digit=False, encoding=None):
+    """计算文件里包含多少数字字符，默认每次读取 1MB
+
+    :param block_size: 每次读取的字节数
+    :param per_digit: 为 True 时返回每个数字的出现次数 {'0': n, ..., '9': n}
+    :param encoding: 文件编码，默认按 ASCII 兼容编码处理，不做解码（见 5.5 BlockReader）
+    """
+    histogram = [0] * 10
+    count = 0
+    with open(fname, 'rb') as fp:
+        for chunk in BlockReader(fp, block_size, encoding=encoding).iter_ascii_bytes():
+            if per_digit:
+                histogram = [x + y for x, y in zip(histogram, digit_histogram(chunk))]
+            else:
+                count += len(chunk.translate(None, _NON_DIGIT_BYTES))
+    if per_digit:
+        return {str(digit): num for digit, num in enumerate(histogram)}
+    return count
+
+
+def count_even_groups_fast(fname, block_size=DIGIT_BLOCK_SIZE):
+    """统计文件里所有偶数字符出现的次数，结果与 count_even_groups 一致"""
+    histogram = count_digits_fast(fname, block_size, per_digit=True)
+    return {num: count for num, count in histogram.items() if int(num) % 2 == 0 and count}
+
+
+def bench_count_digits(fname, block_size=DIGIT_BLOCK_SIZE):
+    """对比逐字符统计和快速版本的耗时"""
+    import time
+
+    for func in (count_digits, count_digits_v2, partial(count_digits_fast, block_size=block_size)):
+        st = time.perf_counter()
+        func(fname)
+        print(f'{getattr(func, "__name__", "count_digits_fast")}: {time.perf_counter() - st:.3f} seconds')
+
+# bench_count_digits('big_file.txt', block_size=1024 * 1024 * 4)
+
+
+# 5.3 多进程 + mmap 统计数字：把文件按字节范围切分，每个进程统计一段，最后合并
+    # - 数字统计与换行无关，直接按字节均分即可
+    # - mmap 映射文件后由操作系统按需换页，各进程只读取自己负责的范围
+    # - bytes.translate 执行时不会释放 GIL，所以使用进程池而不是线程池
+import mmap
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+
+def _digit_histogram_range(fname, start, end, block_size=DIGIT_BLOCK_SIZE):
+    """在子进程中统计文件 [start, end) 范围内每个数字的出现次数"""
+    with open(fname, 'rb') as fp, mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if np is not None:
+            # frombuffer 直接在映射的内存上创建视图，不复制数据
+            counts = np.zeros(256, dtype=np.int64)
+            view = None
+            for pos in range(start, end, block_size):
+                view = np.frombuffer(mm, dtype=np.uint8, count=min(block_size, end - pos), offset=pos)
+                counts += np.bincount(view, minlength=256)
+            # 关闭 mmap 前必须释放所有视图
+            del view
+            return counts[_DIGIT_BYTES[0]:_DIGIT_BYTES[-1] + 1].tolist()
+
+        histogram = [0] * 10
+        for pos in range(start, end, block_size):
+            chunk = mm[pos:min(pos + block_size, end)]
+            histogram = [x + y for x, y in zip(histogram, digit_histogram(chunk))]
+        return histogram
+
+
+def count_digit_groups_parallel(fname, workers=None, block_size=DIGIT_BLOCK_SIZE):
+    """多进程统计文件中每个数字的出现次数
+
+    :param workers: 进程数，默认为 CPU 核数
+    :return: Counter({'0': n, ..., '9': n})
+    """
+    workers = workers or os.cpu_count() or 1
+    file_size = os.path.getsize(fname)
+    counter = Counter()
+    # 空文件无法创建 mmap
+    if not file_size:
+        return counter
+
+    offsets = sorted({file_size * i // workers for i in range(workers + 1)})
+    ranges = list(zip(offsets, offsets[1:]))
+    if len(ranges) == 1:
+        histograms = [_digit_histogram_range(fname, 0, file_size, block_size)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            starts, ends = zip(*ranges)
+            histograms = list(executor.map(
+                _digit_histogram_range, [fname] * len(ranges), starts, ends, [block_size] * len(ranges)
+            ))
+
+    for histogram in histograms:
+        counter.update({str(digit): num for digit, num in enumerate(histogram) if num})
+    return counter
+
+'''
+>>> counter = count_digit_groups_parallel('big_file.txt')
+>>> sum(counter.values())                                           # 等同于 count_digits_v3
+>>> {num: n for num, n in counter.items() if int(num) % 2 == 0}     # 等同于 count_even_groups
+'''
+
+
+def bench_digit_scaling(fname, max_workers=None):
+    """输出不同进程数下的耗时和加速比"""
+    import time
+
+    max_workers = max_workers or os.cpu_count() or 1
+    workers, base = 1, None
+    while workers <= max_workers:
+        st = time.perf_counter()
+        count_digit_groups_parallel(fname, workers=workers)
+        cost = time.perf_counter() - st
+        base = base or cost
+        print(f'workers={workers}: {cost:.3f} seconds, speedup {base / cost:.2f}x')
+        workers *= 2
+
+# bench_digit_scaling('big_file.txt')
+
+
+# 5.4 按块批量返回的生成器：保留 “拆分数据生成和数据消费” 的思路，但不再逐个字符 yield
+    # - read_file_digits 每个数字都要恢复一次生成器，消费方还要逐个调用 int(num)
+    # - 批量版本每个块只 yield 一次：该块中的全部数字（bytes），或者 10 个数字各自的计数
+    # - iter_digits() 把批量结果展开成单个字符，现有的逐个消费代码无需修改
+def read_file_digit_batches(fp, block_size=DIGIT_BLOCK_SIZE):
+    """生成器函数：分块读取文件内容，每块返回一个只包含数字字符的 bytes
+
+    :param fp: 文件对象，文本模式或二进制模式均可
+    """
+    for chunk in BlockReader(fp, block_size).iter_ascii_bytes():
+        digits = chunk.translate(None, _NON_DIGIT_BYTES)
+        if digits:
+            # BlockReader 复用 bytearray 缓冲区，只复制过滤后的数字，统一返回 bytes
+            yield bytes(digits)
+
+
+def read_file_digit_counts(fp, block_size=DIGIT_BLOCK_SIZE):
+    """生成器函数：分块读取文件内容，每块返回 0～9 各自出现次数的列表"""
+    for chunk in BlockReader(fp, block_size).iter_ascii_bytes():
+        yield digit_histogram(chunk)
+
+
+def iter_digits(batches):
+    """适配器：把按块返回的数字 bytes 展开为逐个数字字符，与 read_file_digits 的输出一致"""
+    for digits in batches:
+        # 在 C 层面逐个字符迭代，比逐个恢复生成器快得多
+        yield from digits.decode('ascii')
+
+
+# 按块消费：统计数字
+def count_digits_v4(fname):
+    count = 0
+    with open(fname, 'rb') as file:
+        for digits in read_file_digit_batches(file):
+            count += len(digits)
+    return count
+
+# 按块消费：统计偶数
+def count_even_groups_v2(fname):
+    counter = defaultdict(int)
+    with open(fname, 'rb') as file:
+        for histogram in read_file_digit_counts(file):
+            for num in range(0, 10, 2):
+                if histogram[num]:
+                    counter[str(num)] += histogram[num]
+    return counter
+
+# 原有的逐个消费代码，只需要替换数据来源：
+# for num in iter_digits(read_file_digit_batches(file)):
+#     if int(num) % 2 == 0:
+#         counter[num] += 1
+
+
+# 5.5 可复用的分块读取器：readinto() + 预分配缓冲区，按需解码
+    # - iter(partial(fp.read, block_size), '') 每次都会创建新的 str，文本模式还要先解码
+    # - readinto() 把数据直接读进同一个 bytearray，整块读满时不产生任何新对象
+    # - 对 ASCII 兼容编码（多字节字符中不会出现 0x00～0x7F 的字节）查找 ASCII 字符时无须解码
+    # - 调用方需要按字符处理时再解码，增量解码器会处理被块边界切断的多字节字符
+import codecs
+import io
+
+# 多字节字符的各个字节都不会落在 ASCII 数字范围内的编码（GB18030 的四字节字符不满足，不在此列）
+_ASCII_SAFE_ENCODINGS = {
+    'ascii', 'utf-8', 'utf-8-sig', 'iso8859-1', 'cp1252', 'gbk', 'big5', 'shift_jis', 'euc_jp', 'euc_kr',
+}
+
+
+def is_ascii_safe_encoding(encoding):
+    """判断是否可以不解码，直接在字节层面查找 ASCII 字符，encoding 为 None 时视为二进制数据"""
+    return encoding is None or codecs.lookup(encoding).name in _ASCII_SAFE_ENCODINGS
+
+
+class BlockReader:
+    """分块读取文件，默认返回不解码的字节块
+
+    :param fp: 文件对象；文本模式的文件对象会直接读取其底层的二进制缓冲区，请勿与 fp.read() 混用；
+               没有二进制缓冲区的文本流（如 io.StringIO）读出 str 后编码为 UTF-8
+    :param block_size: 每块的字节数
+    :param encoding: 文件编码，默认使用文本文件对象的编码，二进制文件为 None
+    :param errors: 解码出错时的处理方式，同 bytes.decode()
+    """
+
+    def __init__(self, fp, block_size=DIGIT_BLOCK_SIZE, encoding=None, errors='strict'):
+        self.fp = getattr(fp, 'buffer', fp)
+        self.block_size = block_size
+        # 无法绕过解码的文本流，按字符数读取
+        self.is_text_stream = isinstance(self.fp, io.TextIOBase)
+        if self.is_text_stream:
+            self.encoding = 'utf-8'
+        else:
+            self.encoding = encoding or getattr(fp, 'encoding', None)
+        self.errors = errors
+
+    def __iter__(self):
+        """返回字节块：整块读满时返回的是同一个被复用的 bytearray，需要保留时请自行复制"""
+        if self.is_text_stream:
+            for text in self._iter_text_stream():
+                yield text.encode('utf-8')
+            return
+
+        buf = bytearray(self.block_size)
+        readinto = getattr(self.fp, 'readinto', None)
+        while True:
+            if readinto is not None:
+                size = readinto(buf)
+            else:
+                data = self.fp.read(self.block_size)
+                size = len(data)
+                buf[:size] = data
+            if not size:
+                break
+            yield buf if size == self.block_size else buf[:size]
+
+    def iter_text(self):
+        """返回解码后的 str 块，被块边界切断的多字节字符会在下一块中完整返回"""
+        if self.is_text_stream:
+            yield from self._iter_text_stream()
+            return
+
+        decoder = codecs.getincrementaldecoder(self.encoding or 'utf-8')(self.errors)
+        for chunk in self:
+            text = decoder.decode(chunk)
+            if text:
+                yield text
+        text = decoder.decode(b'', final=True)
+        if text:
+            yield text
+
+    def _iter_text_stream(self):
+        return iter(lambda: self.fp.read(self.block_size), '')
+
+    def iter_ascii_bytes(self):
+        """返回可以直接按 ASCII 字节处理的块：ASCII 兼容编码不解码，其他编码解码后转为 UTF-8"""
+        if is_ascii_safe_encoding(self.encoding):
+            yield from self
+        else:
+            for text in self.iter_text():
+                yield text.encode('utf-8')
+
+'''
+>>> with open('big_file.txt', encoding='utf-16') as fp:
+...     count = sum(len(chunk.translate(None, _NON_DIGIT_BYTES)) for chunk in BlockReader(fp).iter_ascii_bytes())
+'''
@@ -113,3 +113,168 @@ class CyclicMosaic:
 re.sub(r'\d+', make_cyclic_mosaic(), '商店共 100 个苹果，小明以 12 元每斤的价格买走了')
 re.sub(r'\d+', CyclicMosaic().generate, '商店共 100 个苹果，小明以 12 元每斤的价格买走了')
 # 商店共 *** 个苹果，小明以 XX 元每斤的价格买走了
+
+
+# 2.2 流式屏蔽大文件：预编译多个模式，按块读取，跨块保持 */X 轮换状态
+    # - re.sub 需要把整个文件读进内存；多个模式合并为一个预编译的正则，每块只扫描一遍
+    # - 每块末尾留下最长匹配长度（max_match_length）的数据暂不输出，与下一块拼接后再匹配，跨块的匹配不会被截断
+    # - 已输出文本的末尾保留为上下文，\b、后顾断言等仍能看到块之前的字符
+    # - 轮换下标保存在实例上，匹配长度不超过 max_match_length 时，结果与对整个文件调用 re.sub(pattern, make_cyclic_mosaic(), text) 完全一致
+    # - 不再逐个匹配回调 Python 函数：先取出整块的匹配位置，再用列表推导式批量拼接原文与屏蔽字符
+    # - 互不相关的多个文件交给进程池并行处理，每个文件从 '*' 开始轮换
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import cycle
+
+MASK_CHUNK_SIZE = 1024 * 1024
+
+
+class StreamingMasker:
+    """流式屏蔽文本中的敏感信息
+
+    :param patterns: 正则表达式列表，按顺序合并为一个模式
+    :param chars: 轮换使用的屏蔽字符
+    :param flags: 编译正则使用的标志
+    :param max_match_length: 单个匹配的最大长度，也是保留的上下文长度；
+                             匹配到块末尾的模式（如 \\d+）不受此限制
+    """
+
+    def __init__(self, patterns=(r'\d+',), chars=('*', 'X'), flags=0, max_match_length=256):
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        self.patterns = tuple(patterns)
+        self.chars = tuple(chars)
+        self.flags = flags
+        self.max_match_length = max_match_length
+        self.pattern = re.compile('|'.join(f'(?:{p})' for p in self.patterns), flags)
+        self.reset()
+
+    def reset(self):
+        """重置轮换状态与缓冲区，用于处理下一个独立的文本"""
+        self.match_count = 0
+        self._char_index = 0
+        self._context = ''
+        self._pending = ''
+
+    def feed(self, chunk):
+        """输入一块文本，返回可以确定的屏蔽结果；剩余部分留待下一块或 flush()"""
+        return self._mask(self._context + self._pending + chunk, len(self._context), final=False)
+
+    def flush(self):
+        """输入结束，返回剩余部分的屏蔽结果"""
+        output = self._mask(self._context + self._pending, len(self._context), final=True)
+        self._context = ''
+        return output
+
+    def _mask(self, buffer, pos, final):
+        end = len(buffer)
+        spans = [matchobj.span() for matchobj in self.pattern.finditer(buffer, pos)]
+        if final:
+            commit_end = end
+        else:
+            # 从 safe 之前开始的匹配不会再因为后续数据而改变；
+            # 之后开始或者碰到块末尾的匹配可能延续到下一块，从匹配开头起留待下一块
+            safe = end - self.max_match_length
+            commit_end = max(pos, safe)
+            while spans and (spans[-1][0] >= safe or spans[-1][1] == end):
+                start = spans.pop()[0]
+                if start < safe:
+                    commit_end = start
+            # 同一位置先有空匹配、再有非空匹配时（如 (?=\d)|\d+），空匹配也要留待下一块，避免重复计入轮换
+            while spans and spans[-1][0] >= commit_end:
+                spans.pop()
+            if spans:
+                commit_end = max(commit_end, spans[-1][1])
+
+        # 匹配之间的原文与屏蔽字符交替拼接，屏蔽字符从当前轮换位置开始；
+        # 与 re.sub 一样，空匹配也会调用一次替换函数，因此同样推进轮换，只是替换为空串
+        starts = [start for start, _ in spans]
+        stops = [stop for _, stop in spans]
+        chars = self.chars[self._char_index:] + self.chars[:self._char_index]
+        pieces = [None] * (len(spans) * 2 + 1)
+        pieces[::2] = [buffer[a:b] for a, b in zip([pos] + stops, starts + [commit_end])]
+        pieces[1::2] = [char * (stop - start) for char, start, stop in zip(cycle(chars), starts, stops)]
+
+        self._char_index = (self._char_index + len(spans)) % len(self.chars)
+        self.match_count += len(spans)
+        self._pending = buffer[commit_end:]
+        self._context = buffer[max(0, commit_end - self.max_match_length):commit_end]
+        return ''.join(pieces)
+
+    def mask_text(self, text):
+        """屏蔽一段完整文本"""
+        self.reset()
+        return self.feed(text) + self.flush()
+
+    def iter_mask(self, chunks):
+        """生成器：逐块输入文本，逐块产出屏蔽结果"""
+        for chunk in chunks:
+            output = self.feed(chunk)
+            if output:
+                yield output
+        output = self.flush()
+        if output:
+            yield output
+
+    def mask_stream(self, fp_in, fp_out, chunk_size=MASK_CHUNK_SIZE):
+        """从 fp_in 读取文本，屏蔽后写入 fp_out，返回匹配数"""
+        self.reset()
+        chunks = iter(lambda: fp_in.read(chunk_size), '')
+        for output in self.iter_mask(chunks):
+            fp_out.write(output)
+        return self.match_count
+
+    def mask_file(self, src, dst, encoding='utf-8', chunk_size=MASK_CHUNK_SIZE):
+        """屏蔽文件 src 并写入 dst，返回匹配数"""
+        # newline='' 保留原始换行符
+        with open(src, encoding=encoding, newline='') as fp_in, \
+                open(dst, 'w', encoding=encoding, newline='') as fp_out:
+            return self.mask_stream(fp_in, fp_out, chunk_size)
+
+
+_worker_masker = None
+
+
+def _init_mask_worker(options):
+    # 每个进程只编译一次模式
+    global _worker_masker
+    _worker_masker = StreamingMasker(**options)
+
+
+def _mask_file_in_worker(src, dst, encoding, chunk_size):
+    return _worker_masker.mask_file(src, dst, encoding=encoding, chunk_size=chunk_size)
+
+
+def mask_files(jobs, processes=None, encoding='utf-8', chunk_size=MASK_CHUNK_SIZE, **options):
+    """多进程屏蔽多个互不相关的文件
+
+    :param jobs: (src, dst) 列表
+    :param processes: 进程数，默认为 CPU 核数
+    :param options: 传给 StreamingMasker 的参数（patterns、chars 等）
+    :return: 按 jobs 顺序排列的匹配数列表
+    """
+    jobs = list(jobs)
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(jobs) <= 1:
+        masker = StreamingMasker(**options)
+        return [masker.mask_file(src, dst, encoding=encoding, chunk_size=chunk_size) for src, dst in jobs]
+
+    with ProcessPoolExecutor(
+            max_workers=min(processes, len(jobs)), initializer=_init_mask_worker, initargs=(options,)
+    ) as executor:
+        srcs, dsts = zip(*jobs)
+        return list(executor.map(
+            _mask_file_in_worker, srcs, dsts, [encoding] * len(jobs), [chunk_size] * len(jobs)
+        ))
+
+
+PII_PATTERNS = (
+    r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+',  # 邮箱
+    r'(?<!\d)1[3-9]\d{9}(?!\d)',  # 手机号
+    r'\d+',
+)
+
+StreamingMasker().mask_text('商店共 100 个苹果，小明以 12 元每斤的价格买走了')
+# 商店共 *** 个苹果，小明以 XX 元每斤的价格买走了
+# mask_files([(f'logs/access_{hour:02}.log', f'masked/access_{hour:02}.log') for hour in range(24)],
+#            patterns=PII_PATTERNS)
@@ -209,3 +209,265 @@ def provide_number(min_num, max_num):
 >>> Foo().print_random_number()
 93
 """
+
+
+# 7.带过期时间与内存上限的缓存装饰器（类实例实现）
+    # - functools.lru_cache 只能限制条目数，结果永不过期，也只统计命中/未命中次数
+    # - ttl：结果缓存的秒数，过期后重新计算；max_bytes：按近似内存占用淘汰最久未使用的结果
+    # - 同一参数并发未命中时只计算一次，其他调用等待第一个调用的结果（异常不缓存，同样传给等待者）；
+    #   协程被取消只影响它自己，其他等待者中的一个接着计算
+    # - 被装饰函数是协程函数时，返回协程，等待过程不阻塞事件循环
+    # - cache_info() 返回统计信息，cache_clear() 清空缓存，invalidate(*args, **kwargs) 删除单个结果
+import asyncio
+import inspect
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from types import MethodType
+from typing import NamedTuple
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    # 等待其他调用计算结果的次数
+    waits: int
+    expired: int
+    evictions: int
+    currsize: int
+    nbytes: int
+    max_bytes: object
+
+
+_KWARGS_MARK = object()
+# 负责计算的协程被取消时，传给等待者的结果
+_RETRY = object()
+
+
+class _CacheEntry(NamedTuple):
+    value: object
+    expires_at: float
+    size: int
+
+
+def approx_sizeof(obj, _seen=None):
+    """近似计算对象及其包含的容器元素占用的字节数"""
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(approx_sizeof(k, _seen) + approx_sizeof(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(approx_sizeof(item, _seen) for item in obj)
+    elif hasattr(obj, '__dict__'):
+        size += approx_sizeof(vars(obj), _seen)
+    return size
+
+
+class TTLCache:
+    """缓存被装饰函数的结果
+
+    :param func: 被装饰函数
+    :param ttl: 结果缓存的秒数，为 None 时不过期
+    :param maxsize: 最多缓存的结果数，为 None 时不限制
+    :param max_bytes: 缓存结果的近似总字节数上限，为 None 时不限制
+    :param sizeof: 计算结果占用字节数的函数
+    :param typed: 为 True 时，1 与 1.0 分开缓存
+    """
+
+    def __init__(self, func, *, ttl=None, maxsize=None, max_bytes=None, sizeof=approx_sizeof, typed=False):
+        update_wrapper(self, func)
+        self.func = func
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.typed = typed
+        self.is_async = inspect.iscoroutinefunction(func)
+
+        self._cache = OrderedDict()
+        # 正在计算中的参数 -> Future，同一参数的并发调用等待同一个 Future
+        self._pending = {}
+        self._lock = threading.RLock()
+        self._nbytes = 0
+        self._hits = self._misses = self._waits = self._expired = self._evictions = 0
+
+    def _make_key(self, args, kwargs):
+        items = tuple(sorted(kwargs.items()))
+        key = args + (_KWARGS_MARK,) + items if items else args
+        if self.typed:
+            key += tuple(type(v) for v in args) + tuple(type(v) for _, v in items)
+        return key
+
+    def _get(self, key):
+        """返回 (是否命中, 结果)，需在持有锁时调用"""
+        entry = self._cache.get(key)
+        if entry is None:
+            return False, None
+        if entry.expires_at < time.monotonic():
+            self._remove(key)
+            self._expired += 1
+            return False, None
+        self._cache.move_to_end(key)
+        self._hits += 1
+        return True, entry.value
+
+    def _set(self, key, value):
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            # 单个结果超过上限，不缓存
+            return
+        expires_at = float('inf') if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            if key in self._cache:
+                self._remove(key)
+            self._cache[key] = _CacheEntry(value, expires_at, size)
+            self._nbytes += size
+            self._shrink()
+
+    def _remove(self, key):
+        self._nbytes -= self._cache.pop(key).size
+
+    def _is_full(self):
+        return (
+            (self.maxsize is not None and len(self._cache) > self.maxsize)
+            or (self.max_bytes is not None and self._nbytes > self.max_bytes)
+        )
+
+    def _shrink(self):
+        """超出上限时先删除已过期的结果，再按最久未使用淘汰"""
+        if not self._is_full():
+            return
+        now = time.monotonic()
+        for key in [key for key, entry in self._cache.items() if entry.expires_at < now]:
+            self._remove(key)
+            self._expired += 1
+        while self._is_full():
+            self._remove(next(iter(self._cache)))
+            self._evictions += 1
+
+    def _lookup(self, key):
+        """返回 (是否命中, 结果, 需要等待的 Future, 是否由当前调用计算)"""
+        with self._lock:
+            hit, value = self._get(key)
+            if hit:
+                return True, value, None, False
+            future = self._pending.get(key)
+            if future is not None:
+                self._waits += 1
+                return False, None, future, False
+            self._misses += 1
+            future = self._pending[key] = Future()
+            return False, None, future, True
+
+    def _finish(self, key, future, value=None, exc=None, cache=True):
+        if exc is None and cache:
+            self._set(key, value)
+        with self._lock:
+            del self._pending[key]
+        if exc is None:
+            future.set_result(value)
+        else:
+            future.set_exception(exc)
+
+    def __call__(self, *args, **kwargs):
+        if self.is_async:
+            return self._call_async(args, kwargs)
+
+        key = self._make_key(args, kwargs)
+        hit, value, future, is_owner = self._lookup(key)
+        if hit:
+            return value
+        if not is_owner:
+            return future.result()
+        try:
+            value = self.func(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key, future, exc=e)
+            raise
+        self._finish(key, future, value)
+        return value
+
+    async def _call_async(self, args, kwargs):
+        key = self._make_key(args, kwargs)
+        while True:
+            hit, value, future, is_owner = self._lookup(key)
+            if hit:
+                return value
+            if not is_owner:
+                # shield：等待者被取消时不能取消共享的 Future
+                value = await asyncio.shield(asyncio.wrap_future(future))
+                if value is _RETRY:
+                    # 负责计算的协程被取消，重新查找，由其中一个等待者接着计算
+                    continue
+                return value
+            try:
+                value = await self.func(*args, **kwargs)
+            except asyncio.CancelledError:
+                # 取消只影响当前调用，不传给其他等待者
+                self._finish(key, future, _RETRY, cache=False)
+                raise
+            except BaseException as e:
+                self._finish(key, future, exc=e)
+                raise
+            self._finish(key, future, value)
+            return value
+
+    def __get__(self, instance, owner=None):
+        # 支持装饰类方法，与普通函数一样绑定 self
+        if instance is None:
+            return self
+        return MethodType(self, instance)
+
+    def cache_info(self):
+        """返回缓存统计信息"""
+        with self._lock:
+            return CacheInfo(
+                self._hits, self._misses, self._waits, self._expired, self._evictions,
+                len(self._cache), self._nbytes, self.max_bytes,
+            )
+
+    def cache_clear(self):
+        """清空缓存与统计信息"""
+        with self._lock:
+            self._cache.clear()
+            self._nbytes = 0
+            self._hits = self._misses = self._waits = self._expired = self._evictions = 0
+
+    def invalidate(self, *args, **kwargs):
+        """删除以这组参数调用时缓存的结果，返回是否存在该结果"""
+        key = self._make_key(args, kwargs)
+        with self._lock:
+            if key not in self._cache:
+                return False
+            self._remove(key)
+            return True
+
+
+def ttl_cache(func=None, **kwargs):
+    """装饰器：缓存函数结果，参数见 TTLCache"""
+    if func is None:
+        return functools.partial(TTLCache, **kwargs)
+    return TTLCache(func, **kwargs)
+
+# 调用方式
+'''
+@ttl_cache(ttl=60, max_bytes=64 * 1024 * 1024)
+def calculate_score(class_id):
+    time.sleep(60)
+    return 42
+
+@ttl_cache(ttl=10)
+async def fetch_profile(user_id): ...
+
+>>> calculate_score(1), calculate_score(1)
+(42, 42)
+>>> calculate_score.cache_info()
+CacheInfo(hits=1, misses=1, waits=0, expired=0, evictions=0, currsize=1, nbytes=28, max_bytes=67108864)
+>>> calculate_score.invalidate(1)
+True
+'''